@@ -0,0 +1,79 @@
+"""
+Columnar binary encodings for layer responses (alternative to GeoJSON).
+The frontend rebuilds hexes from the uint64 H3 ids, so no geometry is sent.
+
+packed layout (little-endian):
+  [0:4]   magic b"H3PK"
+  [4:8]   uint32 row count n
+  [8:12]  uint32 header length m
+  [12:12+m] UTF-8 JSON header: {"columns": [{"name", "dtype", "offset"}], "levels": {column: [labels]}}
+  column buffers of n values each, starting at the given byte offsets (8-byte aligned),
+  readable as BigUint64Array / Float32Array / Uint8Array views on the response buffer.
+"""
+from __future__ import annotations
+
+import json
+import struct
+
+import numpy as np
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PACKED_MEDIA_TYPE = "application/octet-stream"
+PACKED_MAGIC = b"H3PK"
+
+
+def encode_arrow(columns: dict[str, np.ndarray], levels: dict[str, list[str]] | None = None) -> bytes:
+    """Arrow IPC stream of one record batch; columns in `levels` become dictionary arrays."""
+    import pyarrow as pa
+
+    levels = levels or {}
+    arrays = []
+    for name, values in columns.items():
+        if name in levels:
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(values), pa.array(levels[name])))
+        else:
+            arrays.append(pa.array(values))
+    batch = pa.RecordBatch.from_arrays(arrays, names=list(columns))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_packed(columns: dict[str, np.ndarray], levels: dict[str, list[str]] | None = None) -> bytes:
+    """Typed-array payload (see module docstring)."""
+    n = len(next(iter(columns.values()))) if columns else 0
+    specs, relative, size = [], [], 0
+    for name, values in columns.items():
+        specs.append({"name": name, "dtype": values.dtype.name, "offset": 0})
+        relative.append(size)
+        size += -(-values.nbytes // 8) * 8
+    header = {"columns": specs, "levels": levels or {}}
+    # Data starts after the (padded) header; offsets depend on the header length, so iterate
+    start = 0
+    while True:
+        for spec, rel in zip(specs, relative):
+            spec["offset"] = start + rel
+        raw = json.dumps(header, separators=(",", ":")).encode()
+        needed = -(-(12 + len(raw)) // 8) * 8
+        if needed <= start:
+            break
+        start = needed
+    raw = raw.ljust(start - 12)
+    out = bytearray(PACKED_MAGIC + struct.pack("<II", n, len(raw)) + raw)
+    for values in columns.values():
+        buf = np.ascontiguousarray(values).astype(values.dtype.newbyteorder("<"), copy=False).tobytes()
+        out += buf + b"\0" * (-len(buf) % 8)
+    return bytes(out)
+
+
+def decode_packed(body: bytes) -> dict[str, np.ndarray]:
+    """Inverse of encode_packed (for clients written in Python and for checks)."""
+    if body[:4] != PACKED_MAGIC:
+        raise ValueError("Not a packed layer payload")
+    n, m = struct.unpack("<II", body[4:12])
+    header = json.loads(body[12:12 + m])
+    return {
+        c["name"]: np.frombuffer(body, dtype=np.dtype(c["dtype"]).newbyteorder("<"), count=n, offset=c["offset"])
+        for c in header["columns"]
+    }
@@ -3,17 +3,50 @@ GeoJSON-first API for the interactive map.
 GET /layers/risk?date=YYYY-MM-DD
 GET /layers/cost?date=...
 GET /layers/recommendations?date=...
+GET /layers/risk/range?start=...&end=...
+GET /top?date=...&metric=...&k=...
+GET /export/{risk|cost}?start=...&end=...
 GET /cell/{h3_id}/history
 """
 from __future__ import annotations
 
+import base64
+import gzip
+import hashlib
 import json
+import logging
 import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from functools import cached_property
 from pathlib import Path
+from typing import Callable, Iterable, Iterator
 
+import h3
+import numpy as np
 import pandas as pd
-from fastapi import FastAPI, Query
+import shapely
+import shapely.geometry
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:  # stdlib fallback
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
 
 # Run from repo root (uvicorn backend.api.main) or backend
 ROOT = Path(__file__).resolve().parent.parent.parent
@@ -22,8 +55,46 @@ for p in (BACKEND, ROOT):
     if str(p) not in sys.path:
         sys.path.insert(0, str(p))
 
-from config import API_PREFIX, FEATURES_DIR, GEOJSON_CRS, RISK_THRESHOLD_FOR_REC
-from ingestion.h3_utils import h3_to_geojson_polygon
+from config import (
+    API_PREFIX,
+    FEATURES_DIR,
+    GEOJSON_COORD_PRECISION,
+    GEOJSON_CRS,
+    H3_RESOLUTION,
+    HISTORY_BATCH_MAX_CELLS,
+    LAYER_CACHE_MAX_BYTES,
+    RISK_BAND_THRESHOLDS,
+    RISK_CUBE_LEVELS,
+    RISK_CUBE_MISSING,
+    RISK_RANGE_MAX_DAYS,
+    RELEASES_DIR,
+    RESPONSE_COMPRESS_MIN_BYTES,
+    EXPORT_MAX_DAYS,
+    STREAM_CHUNK_ROWS,
+    TOP_K_MAX,
+    TILE_CACHE_MAX_BYTES,
+    TILE_DETAIL_MIN_ZOOM,
+    TILE_FRAME_CACHE_SIZE,
+    TILE_H3_RES_BY_ZOOM,
+)
+from ingestion.h3_utils import (
+    GEOMETRY_INDEX_FILENAME,
+    CellSpatialIndex,
+    boundary_array,
+    h3_to_geojson_polygon,
+    load_geometry_index,
+)
+from storage.history_store import HISTORY_FILENAME, HistoryStore
+from storage.rankings import rank_column
+from storage.releases import CURRENT_FILENAME, current_release
+from storage.serving import SERVING_SUFFIX, read_serving_file, serving_path
+from storage.risk_cube import RISK_CUBE_FILENAME, RiskCube
+from monitoring.prometheus import PROMETHEUS_MEDIA_TYPE, SIZE_BUCKETS, Registry
+from monitoring.stages import load_pipeline_metrics
+from api.encoding import ARROW_MEDIA_TYPE, PACKED_MEDIA_TYPE, encode_arrow, encode_packed
+from api.tiles import MVT_MEDIA_TYPE, encode_polygon_layer, project, tile_bounds
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Chicago 311 Risk API", version="0.1.0")
 app.add_middleware(
@@ -34,149 +105,1175 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- Metrics (GET /metrics) ---
+_metrics = Registry()
+_REQUEST_SECONDS = _metrics.histogram(
+    "api_request_duration_seconds", "Request latency (to first byte for streamed responses)", ("route", "method", "status"),
+)
+_RESPONSE_BYTES = _metrics.histogram(
+    "api_response_size_bytes", "Response body size (Content-Length; streamed responses not counted)", ("route",), SIZE_BUCKETS,
+)
+_CACHE_LOOKUPS = _metrics.counter("api_cache_lookups_total", "Serialized body cache lookups", ("cache", "result"))
+_DATASET_INFO = _metrics.gauge("api_dataset_info", "Loaded dataset version per data file", ("file", "release", "version"))
+_DATASET_ROWS = _metrics.gauge("api_dataset_rows", "Rows in the loaded dataset per data file", ("file",))
+_PIPELINE_STAGE_SECONDS = _metrics.gauge("pipeline_stage_duration_seconds", "Last pipeline run: wall time per stage", ("stage",))
+_PIPELINE_STAGE_ROWS = _metrics.gauge("pipeline_stage_rows", "Last pipeline run: rows in / out per stage", ("stage", "direction"))
+_PIPELINE_STAGE_RSS = _metrics.gauge("pipeline_stage_max_rss_bytes", "Last pipeline run: process peak RSS at the end of each stage", ("stage",))
+_PIPELINE_LAST_RUN = _metrics.gauge("pipeline_last_run_info", "Last pipeline run (1); status / release as labels", ("status", "release", "finished_at"))
 
-def _load_predictions() -> pd.DataFrame:
-    path = FEATURES_DIR / "cell_day_predictions.parquet"
-    if not path.exists():
-        return pd.DataFrame()
-    return pd.read_parquet(path)
 
+@app.middleware("http")
+async def _observe_request(request: Request, call_next):
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    _REQUEST_SECONDS.observe(time.perf_counter() - t0, route=path, method=request.method, status=response.status_code)
+    size = response.headers.get("content-length")
+    if size is not None:
+        _RESPONSE_BYTES.observe(int(size), route=path)
+    return response
 
-def _load_recommendations() -> pd.DataFrame:
-    path = FEATURES_DIR / "recommendations.parquet"
-    if not path.exists():
-        return pd.DataFrame()
-    return pd.read_parquet(path)
 
+class _Snapshot:
+    """One loaded version of a parquet file: dates parsed once, indexed by date and by h3_id."""
 
-def _predictions_for_date(df: pd.DataFrame, date: str) -> pd.DataFrame:
-    df = df.copy()
-    df["date"] = pd.to_datetime(df["date"]).dt.normalize()
-    target = pd.to_datetime(date).normalize()
-    return df[df["date"] == target]
+    def __init__(self, df: pd.DataFrame, fingerprint: tuple, prepared: bool = False) -> None:
+        """prepared: dates already normalized and rows date-sorted (serving files); df is used as-is."""
+        self.fingerprint = fingerprint
+        if "date" in df.columns:
+            if not prepared:
+                df["date"] = pd.to_datetime(df["date"]).dt.normalize()
+                df = df.sort_values("date", kind="stable").reset_index(drop=True)
+            # Rows of a date are one contiguous slice
+            self._dates = df["date"].to_numpy()
+            starts = np.flatnonzero(np.r_[True, self._dates[1:] != self._dates[:-1]]) if len(df) else np.empty(0, int)
+            ends = np.append(starts[1:], len(df))
+            self._by_date = {pd.Timestamp(self._dates[a]): slice(int(a), int(b)) for a, b in zip(starts, ends)}
+        else:
+            self._by_date = {}
+        self._spatial: CellSpatialIndex | None = None
+        self._member_spatial: CellSpatialIndex | None = None
+        self._cell_ints: np.ndarray | None = None
+        self._orders: dict[tuple, np.ndarray] = {}
+        self._spatial_lock = threading.Lock()
+        self.df = df
 
+    @cached_property
+    def _by_cell(self) -> dict:
+        """Row positions per cell, already in date order (built on first cell lookup)."""
+        return self.df.groupby("h3_id", sort=False).indices if "h3_id" in self.df.columns else {}
 
-@app.get(f"{API_PREFIX}/layers/risk")
-def get_layers_risk(date: str = Query(..., description="YYYY-MM-DD")):
-    """GeoJSON hexes with p_event_7d, risk_band, drivers."""
-    df = _load_predictions()
-    if df.empty:
-        return {"type": "FeatureCollection", "features": []}
-    df = _predictions_for_date(df, date)
-    if df.empty:
-        return {"type": "FeatureCollection", "features": []}
-    features = []
-    for _, row in df.iterrows():
-        geom = h3_to_geojson_polygon(row["h3_id"])
-        drivers = row.get("top_drivers", "[]")
-        if isinstance(drivers, str):
+    @cached_property
+    def _factorized(self) -> tuple[np.ndarray, pd.Index]:
+        return pd.factorize(self.df["h3_id"])
+
+    @cached_property
+    def _members(self) -> tuple[np.ndarray, np.ndarray, pd.Index]:
+        """Cluster tables (h3_ids: JSON list per row): row and member-cell code per member, and the distinct member cells."""
+        ids = [json.loads(v) for v in self.df["h3_ids"]]
+        rows = np.repeat(np.arange(len(ids)), [len(v) for v in ids])
+        codes, cells = pd.factorize(pd.Series([h for v in ids for h in v], dtype=object))
+        return rows, codes, cells
+
+    @property
+    def cells(self) -> pd.Index:
+        """Distinct h3_ids in order of first appearance."""
+        return self._factorized[1]
+
+    @property
+    def _cell_codes(self) -> np.ndarray:
+        """Per row, the position of its h3_id in cells."""
+        return self._factorized[0]
+
+    def for_date(self, date: str | pd.Timestamp) -> pd.DataFrame:
+        rows = self._by_date.get(pd.to_datetime(date).normalize())
+        return self.df.iloc[rows] if rows is not None else self.df.iloc[0:0]
+
+    def rows_between(self, start: pd.Timestamp, end: pd.Timestamp) -> slice:
+        """Row positions of dates in [start, end] (rows are date-sorted)."""
+        if "date" not in self.df.columns:
+            return slice(0, 0)
+        lo = int(np.searchsorted(self._dates, start.to_datetime64(), side="left"))
+        hi = int(np.searchsorted(self._dates, end.to_datetime64(), side="right"))
+        return slice(lo, hi)
+
+    def iter_rows(
+        self,
+        rows: slice,
+        bbox: tuple | None = None,
+        geometry: shapely.Geometry | None = None,
+        min_p: float | None = None,
+        chunk_rows: int = STREAM_CHUNK_ROWS,
+    ) -> Iterator[pd.DataFrame]:
+        """rows in filtered chunks of at most chunk_rows (views until a filter applies); viewport cells looked up once."""
+        keep = self.cells_in(bbox, geometry) if bbox is not None or geometry is not None else None
+        for start in range(rows.start, rows.stop, chunk_rows):
+            chunk = self.df.iloc[start:min(start + chunk_rows, rows.stop)]
+            yield self._mask_rows(chunk, keep, min_p) if keep is not None or min_p is not None else chunk
+
+    def for_cell(self, h3_id: str) -> pd.DataFrame:
+        rows = self._by_cell.get(h3_id)
+        return self.df.iloc[rows] if rows is not None else self.df.iloc[0:0]
+
+    def top(self, date: str | pd.Timestamp, metric: str, k: int) -> pd.DataFrame:
+        """
+        The k rows of a date with the highest metric, in rank order (missing values last, ties by id).
+        The date's full order is built once per (date, metric) and sliced: from the pipeline's
+        rank_<metric> column when present, else a lexsort like storage.rankings.add_daily_ranks.
+        """
+        day = self.for_date(date)
+        k = min(k, len(day))
+        if k == 0:
+            return day
+        key = (pd.to_datetime(date).normalize(), metric)
+        order = self._orders.get(key)
+        if order is None:
+            rank_col = rank_column(metric)
+            if rank_col in day.columns:
+                order = np.empty(len(day), dtype=np.int64)
+                order[day[rank_col].to_numpy() - 1] = np.arange(len(day))
+            else:
+                values = day[metric].to_numpy(dtype=float)
+                ids = day["h3_id" if "h3_id" in day.columns else "rec_id"].to_numpy()
+                order = np.lexsort((ids, np.where(np.isnan(values), np.inf, -values)))
+            self._orders[key] = order
+        return day.iloc[order[:k]]
+
+    def h3_int(self, df: pd.DataFrame) -> np.ndarray:
+        """uint64 H3 ids for the rows of df (a slice of self.df); converted once per distinct cell."""
+        with self._spatial_lock:
+            if self._cell_ints is None:
+                self._cell_ints = np.array([h3.str_to_int(h) for h in self.cells], dtype=np.uint64)
+        return self._cell_ints[self._cell_codes[df.index.to_numpy()]]
+
+    def cells_in(self, bbox: tuple[float, float, float, float] | None, geometry: shapely.Geometry | None) -> np.ndarray:
+        """Boolean mask over this snapshot's distinct cells (by code) intersecting bbox and geometry."""
+        with self._spatial_lock:
+            if self._spatial is None:
+                self._spatial = CellSpatialIndex(self.cells)
+        return _viewport_mask(self._spatial, bbox, geometry)
+
+    def clusters_in(
+        self,
+        df: pd.DataFrame,
+        bbox: tuple[float, float, float, float] | None,
+        geometry: shapely.Geometry | None,
+    ) -> pd.DataFrame:
+        """Rows of df (a slice of this cluster table) with at least one member cell in the viewport."""
+        rows, codes, cells = self._members
+        with self._spatial_lock:
+            if self._member_spatial is None:
+                self._member_spatial = CellSpatialIndex(cells)
+        hit = np.zeros(len(self.df), dtype=bool)
+        hit[rows[_viewport_mask(self._member_spatial, bbox, geometry)[codes]]] = True
+        return df[hit[df.index.to_numpy()]]
+
+    def filter_rows(
+        self,
+        df: pd.DataFrame,
+        bbox: tuple[float, float, float, float] | None = None,
+        geometry: shapely.Geometry | None = None,
+        min_p: float | None = None,
+    ) -> pd.DataFrame:
+        """Rows of df (a slice of self.df) inside the viewport and with p_event_7d >= min_p."""
+        keep = self.cells_in(bbox, geometry) if bbox is not None or geometry is not None else None
+        return self._mask_rows(df, keep, min_p)
+
+    def _mask_rows(self, df: pd.DataFrame, keep: np.ndarray | None, min_p: float | None) -> pd.DataFrame:
+        """Rows of df whose cell is in keep (a cells_in mask; None = all) and with p_event_7d >= min_p."""
+        mask = np.ones(len(df), dtype=bool)
+        if keep is not None:
+            mask &= keep[self._cell_codes[df.index.to_numpy()]]
+        if min_p is not None:
+            mask &= df["p_event_7d"].to_numpy() >= min_p
+        return df[mask]
+
+
+def _viewport_mask(
+    index: CellSpatialIndex,
+    bbox: tuple[float, float, float, float] | None,
+    geometry: shapely.Geometry | None,
+) -> np.ndarray:
+    keep = np.ones(len(index.h3_ids), dtype=bool)
+    if bbox is not None:
+        keep &= index.query_bbox(*bbox)
+    if geometry is not None:
+        keep &= index.query_geometry(geometry)
+    return keep
+
+
+def _frame_snapshot(path: Path, fingerprint: tuple) -> _Snapshot:
+    """Serving files are memory-mapped (shared across workers); parquet is read into this process."""
+    if path.suffix == SERVING_SUFFIX:
+        return _Snapshot(read_serving_file(path), fingerprint, prepared=True)
+    return _Snapshot(pd.read_parquet(path), fingerprint)
+
+
+class _Releases:
+    """
+    Resolves the directory data files are read from: the release the pipeline's CURRENT pointer
+    names (storage.releases), or FEATURES_DIR before the first publish. When the pointer moves,
+    the files already in use are loaded from the new release in a background thread, and the
+    active directory switches once all of them are ready; until then requests keep being
+    served from the previous release, so a refresh causes no reload latency or mixed versions.
+    If a preload fails the previous release stays active (until the pointer moves again).
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.files: list[_DataFile] = []
+        self._pointer: tuple | None = None
+        self._active: Path | None = None
+        self._target: Path | None = None
+        self._lock = threading.Lock()
+
+    def directory(self) -> Path:
+        try:
+            st = (self.root / CURRENT_FILENAME).stat()
+        except FileNotFoundError:
+            return self._active or FEATURES_DIR
+        pointer = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if pointer != self._pointer:
+            with self._lock:
+                if pointer != self._pointer:
+                    self._pointer = pointer
+                    self._target = current_release(self.root) or FEATURES_DIR
+                    if self._active is None or not any(f.loaded for f in self.files):
+                        self._active = self._target
+                    elif self._target != self._active:
+                        threading.Thread(target=self._switch, args=(self._target,), daemon=True).start()
+        return self._active
+
+    def target(self) -> Path | None:
+        return self._target
+
+    def _switch(self, target: Path) -> None:
+        for f in self.files:
+            if f.loaded:
+                try:
+                    f.load(target)
+                except Exception:
+                    logger.exception("Preloading %s from release %s failed; staying on %s", f.name, target.name, self._active.name)
+                    return
+        load_geometry_index(target / GEOMETRY_INDEX_FILENAME)
+        with self._lock:
+            # A newer pointer may have arrived meanwhile; its own switch will activate it
+            if self._target == target:
+                self._active = target
+
+
+_releases = _Releases(RELEASES_DIR)
+
+
+class _DataFile:
+    """
+    Pipeline output loaded once per process and reloaded only when the file's
+    (mtime, size, inode) fingerprint changes. The new snapshot is built before it
+    replaces the old one, so concurrent requests always see a complete version.
+    Snapshots are kept per release directory (the active one and the one before). Once a
+    directory's file is gone (pruned release) its snapshot keeps being served: mapped and
+    open files outlive the unlink.
+    """
+
+    def __init__(self, name: str, loader: Callable[[Path, tuple], object] = _frame_snapshot) -> None:
+        self.name = name
+        self.loader = loader
+        self._snapshots: OrderedDict[Path, object] = OrderedDict()
+        self._lock = threading.Lock()
+        _releases.files.append(self)
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._snapshots)
+
+    def resolve(self, directory: Path) -> Path:
+        """The pipeline's serving file when there is one (frame loader), else the file itself."""
+        path = directory / self.name
+        if self.loader is _frame_snapshot:
+            serving = serving_path(path)
+            if serving.exists():
+                return serving
+        return path
+
+    @property
+    def path(self) -> Path:
+        return self.resolve(_releases.directory())
+
+    def get(self):
+        directory = _releases.directory()
+        snap = self.load(directory)
+        target = _releases.target()
+        if snap is None and target is not None and target != directory:
+            # Never loaded here and the active release was pruned: read it from the new one
+            snap = self.load(target)
+        return snap
+
+    def load(self, directory: Path):
+        path = self.resolve(directory)
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return self._snapshots.get(directory)
+        fingerprint = (st.st_mtime_ns, st.st_size, st.st_ino)
+        snap = self._snapshots.get(directory)
+        if snap is not None and snap.fingerprint == fingerprint:
+            return snap
+        with self._lock:
+            snap = self._snapshots.get(directory)
+            if snap is None or snap.fingerprint != fingerprint:
+                snap = self.loader(path, fingerprint)
+                snapshots = OrderedDict(self._snapshots)
+                snapshots.pop(directory, None)
+                snapshots[directory] = snap
+                while len(snapshots) > 2:
+                    snapshots.popitem(last=False)
+                self._snapshots = snapshots
+        return snap
+
+
+def _history_snapshot(path: Path, fingerprint: tuple) -> HistoryStore:
+    store = HistoryStore(path)
+    store.fingerprint = fingerprint
+    return store
+
+
+_predictions = _DataFile("cell_day_predictions.parquet")
+_recommendations = _DataFile("recommendations.parquet")
+_cell_recommendations = _DataFile("cell_recommendations.parquet")
+_history = _DataFile(HISTORY_FILENAME, loader=_history_snapshot)
+
+
+def _cube_snapshot(path: Path, fingerprint: tuple) -> RiskCube:
+    cube = RiskCube.load(path)
+    cube.fingerprint = fingerprint
+    return cube
+
+
+_risk_cube = _DataFile(RISK_CUBE_FILENAME, loader=_cube_snapshot)
+
+
+def _predictions_for_date(date: str) -> pd.DataFrame:
+    snap = _predictions.get()
+    return snap.for_date(date) if snap is not None else pd.DataFrame()
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=9)
+    return gzip.compress(body, compresslevel=6)
+
+
+def _accepted_encoding(accept_encoding: str | None) -> str | None:
+    """Preferred content-encoding we can produce: br, then gzip (q=0 excludes)."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
             try:
-                drivers = json.loads(drivers)
-            except Exception:
-                drivers = []
-        features.append({
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    if "br" in accepted and brotli is not None:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def _etag(key: tuple, encoding: str | None) -> str:
+    """Strong ETag from the data version + query (the cache key) and the content-encoding."""
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=12).hexdigest()
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+_CACHE_VERSIONS = 2  # data versions cached per layer: the active release and the one before (as _DataFile keeps)
+
+
+class _LayerCache:
+    """
+    Serialized layer bodies keyed by (layer, data version, date, params), with their gzip / brotli
+    variants compressed on first request. One LRU over entries (body + its variants), capped by
+    their total size in bytes (per process: every worker holds its own cache); eviction drops a
+    body together with its variants, and a body larger than max_bytes is not kept.
+    The last _CACHE_VERSIONS data versions per layer are kept (a release switch overlaps requests
+    on the old and the new snapshot); older versions are evicted and never stored again.
+    """
+
+    def __init__(self, name: str, max_bytes: int) -> None:
+        self.name = name
+        self.max_bytes = max_bytes
+        # key -> {None: body, "gzip": ..., "br": ...}
+        self._entries: OrderedDict[tuple, dict[str | None, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._versions: dict[str, list] = {}  # layer -> live versions, oldest first
+        self._retired: set[tuple] = set()  # (layer, version) evicted for good
+        self._lock = threading.Lock()
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= sum(len(b) for b in entry.values())
+
+    def _admit(self, layer: str, version) -> bool:
+        """Under the lock: whether bodies of this version may be stored; a new version evicts the oldest."""
+        if (layer, version) in self._retired:
+            return False
+        live = self._versions.setdefault(layer, [])
+        if version not in live:
+            live.append(version)
+            while len(live) > _CACHE_VERSIONS:
+                old = live.pop(0)
+                self._retired.add((layer, old))
+                for k in [k for k in self._entries if k[0] == layer and k[1] == old]:
+                    self._drop(k)
+        return True
+
+    def _store(self, key: tuple, body: bytes, encoding: str | None, encoded: bytes) -> None:
+        with self._lock:
+            if not self._admit(key[0], key[1]):
+                return
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {None: body}
+                self._bytes += len(body)
+            if encoding is not None and encoding not in entry:
+                entry[encoding] = encoded
+                self._bytes += len(encoded)
+            self._entries.move_to_end(key)
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+
+    def get(self, key: tuple, build: Callable[[], bytes], encoding: str | None = None) -> tuple[bytes, bytes]:
+        """(body, body as sent) for key: as-is or in a content-encoding ("gzip" / "br")."""
+        body = encoded = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                body, encoded = entry[None], entry.get(encoding)
+        _CACHE_LOOKUPS.inc(cache=self.name, result="miss" if body is None else "hit")
+        if encoded is not None:
+            return body, encoded
+        if body is None:
+            body = build()
+        encoded = body if encoding is None else _compress(body, encoding)
+        self._store(key, body, encoding, encoded)
+        return body, encoded
+
+
+_layer_cache = _LayerCache("layers", LAYER_CACHE_MAX_BYTES)
+
+_EMPTY_COLLECTION = _dumps({"type": "FeatureCollection", "features": []})
+
+
+def _json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+def _cached_response(
+    request: Request,
+    key: tuple,
+    build: Callable[[], bytes],
+    media_type: str = "application/json",
+    cache: _LayerCache | None = _layer_cache,
+    empty_status: int = 200,
+) -> Response:
+    """
+    Conditional, compressed response for the body identified by key (layer, data version, query).
+    A matching If-None-Match is answered 304 without building the body. With a cache, bodies and
+    their gzip / brotli variants are built once per version while they stay in its byte budget; cache=None builds per request
+    (filtered queries) and compresses bodies of at least RESPONSE_COMPRESS_MIN_BYTES.
+    An empty body is answered with empty_status (204 for tiles: no data there).
+    """
+    encoding = _accepted_encoding(request.headers.get("accept-encoding"))
+    etag = _etag(key, encoding)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if cache is not None:
+        raw, body = cache.get(key, build, encoding)
+    else:
+        raw = body = build()
+        if encoding is not None and len(body) >= RESPONSE_COMPRESS_MIN_BYTES:
+            body = _compress(body, encoding)
+        else:
+            encoding = None
+    if not raw and empty_status != 200:
+        return Response(status_code=empty_status, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+_LAYER_MEDIA_TYPES = {
+    "geojson": "application/json",
+    "arrow": ARROW_MEDIA_TYPE,
+    "packed": PACKED_MEDIA_TYPE,
+}
+_BAND_LEVELS = ["low", "medium", "high"]
+
+
+def _negotiate(fmt: str | None, accept: str | None) -> str:
+    """Explicit ?format= wins; otherwise the Accept header picks a binary format; default GeoJSON."""
+    if fmt:
+        return fmt
+    accept = accept or ""
+    if ARROW_MEDIA_TYPE in accept:
+        return "arrow"
+    if PACKED_MEDIA_TYPE in accept:
+        return "packed"
+    return "geojson"
+
+
+def _risk_columns(h3_int: np.ndarray, df: pd.DataFrame) -> tuple[dict, dict]:
+    band = pd.Categorical(df["risk_band"], categories=_BAND_LEVELS).codes.astype(np.uint8)
+    return {
+        "h3_id": h3_int,
+        "p_event_7d": _column(df, "p_event_7d").astype(np.float32),
+        "risk_band": band,
+    }, {"risk_band": _BAND_LEVELS}
+
+
+def _cost_columns(h3_int: np.ndarray, df: pd.DataFrame) -> tuple[dict, dict]:
+    return {
+        "h3_id": h3_int,
+        "expected_cost_usd_7d": _column(df, "expected_cost_usd").astype(np.float32),
+        "p90_cost": _column(df, "p90_cost_usd").astype(np.float32),
+    }, {}
+
+
+_LAYER_COLUMNS = {"risk": _risk_columns, "cost": _cost_columns}
+_BINARY_ENCODERS = {"arrow": encode_arrow, "packed": encode_packed}
+
+
+def _layer_builder(layer: str, snap: _Snapshot | None, fmt: str, geojson: Callable[[pd.DataFrame], bytes]) -> Callable[[pd.DataFrame], bytes]:
+    """df → body for the negotiated format; binary formats carry uint64 h3 ids and float32 values."""
+    if fmt == "geojson":
+        return geojson
+    columns, encode = _LAYER_COLUMNS[layer], _BINARY_ENCODERS[fmt]
+    return lambda df: encode(*columns(snap.h3_int(df) if snap is not None else np.empty(0, np.uint64), df))
+
+
+def _parse_drivers(drivers) -> list:
+    if isinstance(drivers, str):
+        try:
+            return json.loads(drivers)
+        except Exception:
+            return []
+    return drivers if drivers is not None else []
+
+
+def _feature_collection(features: list[dict]) -> bytes:
+    if not features:
+        return _EMPTY_COLLECTION
+    return _dumps({"type": "FeatureCollection", "features": features, "crs": GEOJSON_CRS})
+
+
+def _column(df: pd.DataFrame, name: str, default: float = 0.0) -> np.ndarray:
+    return df[name].to_numpy(dtype=float) if name in df.columns else np.full(len(df), default)
+
+
+def _risk_features(df: pd.DataFrame) -> Iterator[dict]:
+    drivers = df["top_drivers"] if "top_drivers" in df.columns else ["[]"] * len(df)
+    return (
+        {
             "type": "Feature",
-            "geometry": geom,
+            "geometry": h3_to_geojson_polygon(h, GEOJSON_COORD_PRECISION),
             "properties": {
-                "h3_id": row["h3_id"],
-                "p_event_7d": float(row["p_event_7d"]),
-                "risk_band": row["risk_band"],
-                "drivers": drivers,
+                "h3_id": h,
+                "p_event_7d": float(p),
+                "risk_band": band,
+                "drivers": _parse_drivers(d),
             },
-        })
-    return {"type": "FeatureCollection", "features": features, "crs": GEOJSON_CRS}
+        }
+        for h, p, band, d in zip(df["h3_id"], _column(df, "p_event_7d"), df["risk_band"], drivers)
+    )
 
 
-@app.get(f"{API_PREFIX}/layers/cost")
-def get_layers_cost(date: str = Query(..., description="YYYY-MM-DD")):
-    """GeoJSON hexes with expected_cost_usd_7d, p90_cost."""
-    df = _load_predictions()
-    if df.empty:
-        return {"type": "FeatureCollection", "features": []}
-    df = _predictions_for_date(df, date)
-    if df.empty:
-        return {"type": "FeatureCollection", "features": []}
-    features = []
-    for _, row in df.iterrows():
-        geom = h3_to_geojson_polygon(row["h3_id"])
-        features.append({
+def _cost_features(df: pd.DataFrame) -> Iterator[dict]:
+    return (
+        {
             "type": "Feature",
-            "geometry": geom,
+            "geometry": h3_to_geojson_polygon(h, GEOJSON_COORD_PRECISION),
             "properties": {
-                "h3_id": row["h3_id"],
-                "expected_cost_usd_7d": float(row.get("expected_cost_usd", 0)),
-                "p90_cost": float(row.get("p90_cost_usd", 0)),
+                "h3_id": h,
+                "expected_cost_usd_7d": float(e),
+                "p90_cost": float(p90),
             },
-        })
-    return {"type": "FeatureCollection", "features": features, "crs": GEOJSON_CRS}
+        }
+        for h, e, p90 in zip(df["h3_id"], _column(df, "expected_cost_usd"), _column(df, "p90_cost_usd"))
+    )
+
+
+def _risk_layer(df: pd.DataFrame) -> bytes:
+    return _feature_collection(list(_risk_features(df)))
+
+
+def _cost_layer(df: pd.DataFrame) -> bytes:
+    return _feature_collection(list(_cost_features(df)))
+
+
+_LAYER_FEATURES = {"risk": _risk_features, "cost": _cost_features}
+_FEATURES_HEAD = b'{"type":"FeatureCollection","features":['
+_FEATURES_TAIL = b"]," + _dumps({"crs": GEOJSON_CRS})[1:]
+
+
+def _stream_features(
+    frames: Iterable[pd.DataFrame],
+    features: Callable[[pd.DataFrame], Iterator[dict]],
+    dated: bool = False,
+    ndjson: bool = False,
+) -> Iterator[bytes]:
+    """
+    Serialized features, one chunk per frame (slices of a snapshot), so memory stays at one
+    chunk whatever the total size. GeoJSON output is byte-identical to _feature_collection;
+    ndjson yields one feature per line. dated adds each row's date to the properties.
+    """
+    sep = b"\n" if ndjson else b","
+    any_features = False
+    if not ndjson:
+        yield _FEATURES_HEAD
+    for df in frames:
+        if df.empty:
+            continue
+        feats = features(df)
+        if dated:
+            feats = _with_dates(feats, df["date"])
+        chunk = sep.join(_dumps(f) for f in feats)
+        if ndjson:
+            yield chunk + b"\n"
+        else:
+            yield (b"," + chunk) if any_features else chunk
+        any_features = True
+    if not ndjson:
+        yield _FEATURES_TAIL if any_features else b"]}"
+
+
+def _with_dates(features: Iterator[dict], dates: pd.Series) -> Iterator[dict]:
+    for f, d in zip(features, dates.dt.strftime("%Y-%m-%d")):
+        f["properties"]["date"] = d
+        yield f
+
+
+def _cell_recommendations_layer(df: pd.DataFrame) -> bytes:
+    return _feature_collection([
+        {
+            "type": "Feature",
+            "geometry": h3_to_geojson_polygon(h, GEOJSON_COORD_PRECISION),
+            "properties": {
+                "h3_id": h,
+                "rec_id": rec_id,
+                "cluster_rec_id": None if pd.isna(cluster_rec_id) else cluster_rec_id,
+                "action_type": action_type,
+                "delta_p_psi": float(dp),
+                "time_window": time_window,
+                "expected_savings_usd": float(savings),
+                "p_event_7d": float(p),
+                "rationale": rationale,
+            },
+        }
+        for h, rec_id, cluster_rec_id, action_type, dp, time_window, savings, p, rationale in zip(
+            df["h3_id"], df["rec_id"], df["cluster_rec_id"], df["action_type"], df["delta_p_psi"],
+            df["time_window"], df["expected_savings_usd"], df["p_event_7d"], df["rationale"],
+        )
+    ])
+
+
+def _cluster_recommendations_layer(df: pd.DataFrame) -> bytes:
+    return _feature_collection([
+        {
+            "type": "Feature",
+            "geometry": json.loads(geom) if isinstance(geom, str) else geom,
+            "properties": {
+                "rec_id": rec_id,
+                "action_type": action_type,
+                "delta_p_psi": float(dp),
+                "time_window": time_window,
+                "expected_savings_usd": float(savings),
+                "rationale": rationale,
+            },
+        }
+        for geom, rec_id, action_type, dp, time_window, savings, rationale in zip(
+            df["geometry_geojson"], df["rec_id"], df["action_type"], df["delta_p_psi"],
+            df["time_window"], df["expected_savings_usd"], df["rationale"],
+        )
+    ])
+
+
+_BBOX_QUERY = Query(None, description="Viewport west,south,east,north (lon/lat degrees)")
+_POLYGON_QUERY = Query(None, description="GeoJSON Polygon/MultiPolygon geometry (URL-encoded JSON)")
+_MIN_P_QUERY = Query(None, ge=0.0, le=1.0, description="Only cells with p_event_7d >= min_p")
+
+
+def _parse_viewport(bbox: str | None, polygon: str | None) -> tuple[tuple | None, shapely.Geometry | None]:
+    """bbox as (west, south, east, north) and polygon as a valid, non-empty shapely geometry; 400 otherwise."""
+    box = geometry = None
+    if bbox is not None:
+        try:
+            box = tuple(float(v) for v in bbox.split(","))
+        except ValueError:
+            box = ()
+        if len(box) != 4 or box[0] > box[2] or box[1] > box[3]:
+            raise HTTPException(status_code=400, detail="bbox must be west,south,east,north")
+    if polygon is not None:
+        try:
+            geometry = json.loads(polygon)
+        except ValueError:
+            geometry = None
+        if not isinstance(geometry, dict) or geometry.get("type") not in ("Polygon", "MultiPolygon"):
+            raise HTTPException(status_code=400, detail="polygon must be a GeoJSON Polygon or MultiPolygon")
+        try:
+            geometry = shapely.geometry.shape(geometry)
+        except (ValueError, TypeError, KeyError, IndexError, shapely.errors.ShapelyError):
+            geometry = None
+        if geometry is None or geometry.is_empty or not geometry.is_valid:
+            raise HTTPException(status_code=400, detail="polygon must be a valid, non-empty GeoJSON Polygon or MultiPolygon")
+    return box, geometry
+
+
+def _layer_response(
+    request: Request,
+    layer: str,
+    snap: _Snapshot,
+    target: pd.Timestamp,
+    build: Callable[[pd.DataFrame], bytes],
+    bbox: str | None = None,
+    polygon: str | None = None,
+    min_p: float | None = None,
+    fmt: str = "geojson",
+) -> Response:
+    """Whole-day layers come from the cache; viewport / min_p subsets are built per request."""
+    box, geometry = _parse_viewport(bbox, polygon)
+    media_type = _LAYER_MEDIA_TYPES[fmt]
+    if box is None and geometry is None and min_p is None:
+        key = (layer, snap.fingerprint, target, fmt)
+        return _cached_response(request, key, lambda: build(snap.for_date(target)), media_type)
+    key = (layer, snap.fingerprint, target, fmt, box, polygon, min_p)
+    return _cached_response(
+        request, key, lambda: build(snap.filter_rows(snap.for_date(target), box, geometry, min_p)), media_type, cache=None,
+    )
+
+
+def _empty_layer(layer: str, fmt: str) -> Response:
+    if fmt == "geojson":
+        return _json_response(_EMPTY_COLLECTION)
+    empty = pd.DataFrame(columns=["p_event_7d", "risk_band", "expected_cost_usd", "p90_cost_usd"])
+    body = _layer_builder(layer, None, fmt, _risk_layer)(empty)
+    return Response(content=body, media_type=_LAYER_MEDIA_TYPES[fmt], headers={"Vary": "Accept"})
+
+
+_STREAM_QUERY = Query(False, description="Stream the FeatureCollection in chunks (GeoJSON only)")
+_NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _stream_response(
+    snap: _Snapshot,
+    layer: str,
+    rows: slice,
+    bbox: str | None,
+    polygon: str | None,
+    min_p: float | None,
+    dated: bool = False,
+    ndjson: bool = False,
+) -> StreamingResponse:
+    box, geometry = _parse_viewport(bbox, polygon)
+    chunks = _stream_features(snap.iter_rows(rows, box, geometry, min_p), _LAYER_FEATURES[layer], dated, ndjson)
+    return StreamingResponse(chunks, media_type=_NDJSON_MEDIA_TYPE if ndjson else "application/json")
+
+
+_FORMAT_QUERY = Query(
+    None,
+    alias="format",
+    pattern="^(geojson|arrow|packed)$",
+    description="geojson (default), arrow (Arrow IPC stream) or packed (typed arrays); or negotiate via Accept",
+)
+
+
+@app.get(f"{API_PREFIX}/layers/risk")
+def get_layers_risk(
+    request: Request,
+    date: str = Query(..., description="YYYY-MM-DD"),
+    bbox: str | None = _BBOX_QUERY,
+    polygon: str | None = _POLYGON_QUERY,
+    min_p: float | None = _MIN_P_QUERY,
+    fmt: str | None = _FORMAT_QUERY,
+    accept: str | None = Header(None),
+    stream: bool = _STREAM_QUERY,
+):
+    """
+    GeoJSON hexes with p_event_7d, risk_band, drivers. Optional viewport (bbox / polygon) and min_p filters.
+    format=arrow|packed (or Accept) returns columns h3_id (uint64), p_event_7d (float32), risk_band (uint8 code).
+    stream=true sends the GeoJSON in chunks instead of one cached body.
+    """
+    fmt = _negotiate(fmt, accept)
+    snap = _predictions.get()
+    if snap is None:
+        return _empty_layer("risk", fmt)
+    target = pd.to_datetime(date).normalize()
+    if stream and fmt == "geojson":
+        return _stream_response(snap, "risk", snap.rows_between(target, target), bbox, polygon, min_p)
+    build = _layer_builder("risk", snap, fmt, _risk_layer)
+    return _layer_response(request, "risk", snap, target, build, bbox, polygon, min_p, fmt)
+
+
+@app.get(f"{API_PREFIX}/layers/cost")
+def get_layers_cost(
+    request: Request,
+    date: str = Query(..., description="YYYY-MM-DD"),
+    bbox: str | None = _BBOX_QUERY,
+    polygon: str | None = _POLYGON_QUERY,
+    min_p: float | None = _MIN_P_QUERY,
+    fmt: str | None = _FORMAT_QUERY,
+    accept: str | None = Header(None),
+    stream: bool = _STREAM_QUERY,
+):
+    """
+    GeoJSON hexes with expected_cost_usd_7d, p90_cost. Optional viewport (bbox / polygon) and min_p filters.
+    format=arrow|packed (or Accept) returns columns h3_id (uint64), expected_cost_usd_7d, p90_cost (float32).
+    stream=true sends the GeoJSON in chunks instead of one cached body.
+    """
+    fmt = _negotiate(fmt, accept)
+    snap = _predictions.get()
+    if snap is None:
+        return _empty_layer("cost", fmt)
+    target = pd.to_datetime(date).normalize()
+    if stream and fmt == "geojson":
+        return _stream_response(snap, "cost", snap.rows_between(target, target), bbox, polygon, min_p)
+    build = _layer_builder("cost", snap, fmt, _cost_layer)
+    return _layer_response(request, "cost", snap, target, build, bbox, polygon, min_p, fmt)
 
 
 @app.get(f"{API_PREFIX}/layers/recommendations")
 def get_layers_recommendations(
+    request: Request,
     date: str = Query(..., description="YYYY-MM-DD"),
     per_cell: bool = Query(False, description="If true, one GeoJSON feature per high-risk tile (h3 cell); else one per cluster."),
+    bbox: str | None = _BBOX_QUERY,
+    polygon: str | None = _POLYGON_QUERY,
 ):
     """
     GeoJSON polygons + action payload.
     - per_cell=false (default): one feature per cluster of adjacent high-risk cells (MultiPolygon).
-    - per_cell=true: one feature per high-risk tile (one Polygon per h3_id), so every such tile has a recommendation.
+    - per_cell=true: one feature per high-risk tile (one Polygon per h3_id), so every such tile has a recommendation:
+      its cluster's ΔP and its share of the savings; cluster_rec_id is null when the cluster was not kept.
+    With bbox / polygon, only cells (or clusters with at least one cell) in the viewport are returned.
     CRS is GeoJSON (EPSG:4326).
     """
     target = pd.to_datetime(date).normalize()
 
     if per_cell:
-        # One recommendation per high-risk tile (each h3 cell gets its own feature)
-        pred_df = _load_predictions()
-        if pred_df.empty:
-            return {"type": "FeatureCollection", "features": []}
-        pred_df["date"] = pd.to_datetime(pred_df["date"]).dt.normalize()
-        pred_df = pred_df[pred_df["date"] == target]
-        high = pred_df[pred_df["p_event_7d"] >= RISK_THRESHOLD_FOR_REC]
-        if high.empty:
-            return {"type": "FeatureCollection", "features": []}
-        features = []
-        for _, row in high.iterrows():
-            geom = h3_to_geojson_polygon(row["h3_id"])
-            features.append({
-                "type": "Feature",
-                "geometry": geom,
-                "properties": {
-                    "h3_id": row["h3_id"],
-                    "rec_id": f"{row['h3_id']}_{target.date()}",
-                    "action_type": "Pressure reduction test",
-                    "delta_p_psi": 5,
-                    "time_window": "01:00-05:00",
-                    "expected_savings_usd": float(row.get("expected_cost_usd", 0)) * 0.1,
-                    "p_event_7d": float(row["p_event_7d"]),
-                    "rationale": "high 311 recency + stress",
-                },
-            })
-        return {"type": "FeatureCollection", "features": features, "crs": GEOJSON_CRS}
+        # One recommendation per high-risk tile, from the pipeline's per-cell table
+        snap = _cell_recommendations.get()
+        if snap is None:
+            return _json_response(_EMPTY_COLLECTION)
+        return _layer_response(request, "recommendations_cells", snap, target, _cell_recommendations_layer, bbox, polygon)
 
     # Default: one feature per cluster (MultiPolygon)
-    df = _load_recommendations()
-    if df.empty:
-        return {"type": "FeatureCollection", "features": []}
-    df["date"] = pd.to_datetime(df["date"]).dt.normalize()
-    df = df[df["date"] == target]
-    if df.empty:
-        return {"type": "FeatureCollection", "features": []}
-    features = []
-    for _, row in df.iterrows():
-        geom = json.loads(row["geometry_geojson"]) if isinstance(row["geometry_geojson"], str) else row["geometry_geojson"]
-        features.append({
-            "type": "Feature",
-            "geometry": geom,
-            "properties": {
-                "rec_id": row["rec_id"],
-                "action_type": row["action_type"],
-                "delta_p_psi": int(row["delta_p_psi"]),
-                "time_window": row["time_window"],
-                "expected_savings_usd": float(row["expected_savings_usd"]),
-                "rationale": row["rationale"],
-            },
-        })
-    return {"type": "FeatureCollection", "features": features, "crs": GEOJSON_CRS}
+    snap = _recommendations.get()
+    if snap is None:
+        return _json_response(_EMPTY_COLLECTION)
+    box, geometry = _parse_viewport(bbox, polygon)
+    if box is None and geometry is None:
+        key = ("recommendations", snap.fingerprint, target)
+        return _cached_response(request, key, lambda: _cluster_recommendations_layer(snap.for_date(target)))
+    # Viewport: clusters with any member cell inside (member index built once per snapshot)
+    key = ("recommendations", snap.fingerprint, target, box, polygon)
+    return _cached_response(
+        request, key, lambda: _cluster_recommendations_layer(snap.clusters_in(snap.for_date(target), box, geometry)), cache=None,
+    )
+
+
+@app.get(f"{API_PREFIX}/export/{{layer}}")
+async def export_layer(
+    layer: str,
+    start: str = Query(..., description="YYYY-MM-DD"),
+    end: str = Query(..., description="YYYY-MM-DD (inclusive)"),
+    bbox: str | None = _BBOX_QUERY,
+    polygon: str | None = _POLYGON_QUERY,
+    min_p: float | None = _MIN_P_QUERY,
+    fmt: str = Query("geojson", alias="format", pattern="^(geojson|ndjson)$"),
+):
+    """
+    Risk or cost hexes for every date in [start, end] (each feature carries its date), streamed in
+    chunks of STREAM_CHUNK_ROWS rows: one FeatureCollection, or one feature per line (ndjson).
+    """
+    if layer not in _LAYER_FEATURES:
+        raise HTTPException(status_code=404, detail=f"Unknown layer {layer!r}; expected one of {tuple(_LAYER_FEATURES)}")
+    first, last = pd.to_datetime(start).normalize(), pd.to_datetime(end).normalize()
+    if last < first:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if (last - first).days + 1 > EXPORT_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {EXPORT_MAX_DAYS} days per export")
+    # (Re)loading the snapshot reads parquet: keep it off the event loop; chunks are serialized in the threadpool too
+    snap = await run_in_threadpool(_predictions.get)
+    if snap is None:
+        return _json_response(b"" if fmt == "ndjson" else _EMPTY_COLLECTION)
+    return _stream_response(
+        snap, layer, snap.rows_between(first, last), bbox, polygon, min_p, dated=True, ndjson=fmt == "ndjson",
+    )
+
+
+def _risk_range_body(cells: np.ndarray, days: np.ndarray, values: np.ndarray) -> bytes:
+    return _dumps({
+        "cells": cells.tolist(),
+        "dates": [str(d) for d in days],
+        "scale": 1.0 / RISK_CUBE_LEVELS,
+        "missing": RISK_CUBE_MISSING,
+        "shape": [len(cells), len(days)],
+        "values": base64.b64encode(zlib.compress(values.tobytes(), 6)).decode(),
+    })
+
+
+@app.get(f"{API_PREFIX}/layers/risk/range")
+def get_layers_risk_range(
+    request: Request,
+    start: str = Query(..., description="YYYY-MM-DD"),
+    end: str = Query(..., description="YYYY-MM-DD (inclusive)"),
+    bbox: str | None = _BBOX_QUERY,
+    polygon: str | None = _POLYGON_QUERY,
+    min_p: float | None = Query(None, ge=0.0, le=1.0, description="Only cells whose max p_event_7d in the range >= min_p"),
+):
+    """
+    p_event_7d for every cell and day in [start, end], for the time slider, in one call.
+    cells: h3 ids (row order); dates: column order; values: base64 of zlib-compressed uint8,
+    row-major cells × days. p = value * scale, value == missing means no prediction.
+    """
+    first, last = pd.to_datetime(start).normalize(), pd.to_datetime(end).normalize()
+    if last < first:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if (last - first).days + 1 > RISK_RANGE_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {RISK_RANGE_MAX_DAYS} days per call")
+    box, geometry = _parse_viewport(bbox, polygon)
+    cube = _risk_cube.get()
+    if cube is None:
+        return _json_response(_risk_range_body(np.empty(0, str), np.empty(0, "datetime64[D]"), np.empty((0, 0), np.uint8)))
+    # Not cached: every (start, end, viewport) would be another entry, and the cube slice is cheap
+    key = ("risk_range", cube.fingerprint, first, last, box, polygon, min_p)
+    return _cached_response(request, key, lambda: _risk_range_body(*cube.query(first, last, box, geometry, min_p)), cache=None)
+
+
+_TOP_METRICS = {
+    "cells": ("p_event_7d", "expected_cost_usd", "p90_cost_usd"),
+    "clusters": ("expected_savings_usd", "delta_p_psi"),
+}
+
+
+def _top_cells(df: pd.DataFrame) -> list[dict]:
+    return [
+        {
+            "rank": i + 1,
+            "h3_id": h,
+            "p_event_7d": float(p),
+            "risk_band": band,
+            "expected_cost_usd_7d": float(e),
+            "p90_cost": float(p90),
+        }
+        for i, (h, p, band, e, p90) in enumerate(zip(
+            df["h3_id"], _column(df, "p_event_7d"), df["risk_band"],
+            _column(df, "expected_cost_usd"), _column(df, "p90_cost_usd"),
+        ))
+    ]
+
+
+def _top_clusters(df: pd.DataFrame) -> list[dict]:
+    return [
+        {
+            "rank": i + 1,
+            "rec_id": rec_id,
+            "h3_ids": json.loads(ids),
+            "action_type": action_type,
+            "delta_p_psi": float(dp),
+            "time_window": time_window,
+            "expected_savings_usd": float(savings),
+        }
+        for i, (rec_id, ids, action_type, dp, time_window, savings) in enumerate(zip(
+            df["rec_id"], df["h3_ids"], df["action_type"], df["delta_p_psi"],
+            df["time_window"], df["expected_savings_usd"],
+        ))
+    ]
+
+
+@app.get(f"{API_PREFIX}/top")
+def get_top(
+    request: Request,
+    date: str = Query(..., description="YYYY-MM-DD"),
+    k: int = Query(20, ge=1, le=TOP_K_MAX),
+    metric: str = Query("expected_cost_usd", description="cells: p_event_7d | expected_cost_usd | p90_cost_usd; clusters: expected_savings_usd | delta_p_psi"),
+    entity: str = Query("cells", pattern="^(cells|clusters)$"),
+):
+    """
+    The k highest-ranked cells (or recommendation clusters) of a date by metric, highest first.
+    p_event_7d and expected_cost_usd are ranked by the pipeline; other metrics are sorted once per
+    date. Bodies are not cached: every k would be another entry, and slicing the order is cheap.
+    """
+    if metric not in _TOP_METRICS[entity]:
+        raise HTTPException(status_code=400, detail=f"metric for {entity} must be one of {_TOP_METRICS[entity]}")
+    target = pd.to_datetime(date).normalize()
+    snap = (_predictions if entity == "cells" else _recommendations).get()
+    if snap is None:
+        return _json_response(_dumps({"date": str(target.date()), "metric": metric, entity: []}))
+    key = (f"top_{entity}", snap.fingerprint, target, metric, k)
+    build = _top_cells if entity == "cells" else _top_clusters
+    return _cached_response(
+        request,
+        key,
+        lambda: _dumps({"date": str(target.date()), "metric": metric, entity: build(snap.top(target, metric, k))}),
+        cache=None,
+    )
+
+
+_TILE_LAYERS = ("risk", "cost")
+_tile_cache = _LayerCache("tiles", TILE_CACHE_MAX_BYTES)
+_tile_frames: OrderedDict[tuple, "_TileFrame"] = OrderedDict()
+_tile_frames_lock = threading.Lock()
+
+
+def _h3_res_for_zoom(z: int) -> int:
+    res = TILE_H3_RES_BY_ZOOM[0][1]
+    for min_zoom, r in TILE_H3_RES_BY_ZOOM:
+        if z >= min_zoom:
+            res = r
+    return min(res, H3_RESOLUTION)
+
+
+class _TileFrame:
+    """
+    One (layer, date) at one H3 resolution, ready to cut into tiles: per-cell attributes,
+    boundary rings (lon/lat) and bounding boxes. Below H3_RESOLUTION cells are merged into
+    their parent: risk keeps the max p_event_7d, cost sums the children's expected cost.
+    p90_cost is only kept at H3_RESOLUTION: a sum of the children's p90s is not the p90 of the
+    parent (that needs the joint distribution), so merged cells leave it out.
+    """
+
+    def __init__(self, layer: str, df: pd.DataFrame, res: int) -> None:
+        merged = res < H3_RESOLUTION
+        df = df[["h3_id", "p_event_7d", "expected_cost_usd", "p90_cost_usd"]]
+        if merged and not df.empty:
+            parent = [h3.cell_to_parent(h, res) for h in df["h3_id"]]
+            df = df.assign(h3_id=parent).groupby("h3_id", sort=False).agg({
+                "p_event_7d": "max",
+                "expected_cost_usd": "sum",
+            }).reset_index()
+        self.layer = layer
+        self.h3_ids = df["h3_id"].tolist()
+        if layer == "risk":
+            p = df["p_event_7d"].to_numpy(dtype=float)
+            low, high = RISK_BAND_THRESHOLDS
+            band = np.select([p < low, p < high], ["low", "medium"], "high")
+            # First column is the one kept at low zoom
+            self.props = {"p_event_7d": p, "risk_band": band}
+        else:
+            self.props = {"expected_cost_usd_7d": df["expected_cost_usd"].to_numpy(dtype=float)}
+            if not merged:
+                self.props["p90_cost"] = df["p90_cost_usd"].to_numpy(dtype=float)
+        self.coords, self.counts = boundary_array(self.h3_ids)
+        lon, lat = self.coords[..., 0], self.coords[..., 1]
+        self.west, self.east = lon.min(axis=1), lon.max(axis=1)
+        self.south, self.north = lat.min(axis=1), lat.max(axis=1)
+
+    def encode(self, z: int, x: int, y: int, detail: bool) -> bytes:
+        west, south, east, north = tile_bounds(z, x, y)
+        rows = np.flatnonzero(
+            (self.east >= west) & (self.west <= east) & (self.north >= south) & (self.south <= north)
+        )
+        if not len(rows):
+            return b""
+        coords = self.coords[rows]
+        xs, ys = project(coords[..., 0], coords[..., 1], z, x, y)
+        names = list(self.props) if detail else list(self.props)[:1]
+        props = {
+            name: [None if isinstance(v, float) and np.isnan(v) else v for v in self.props[name][rows].tolist()]
+            for name in names
+        }
+        if detail:
+            props["h3_id"] = [self.h3_ids[i] for i in rows]
+        return encode_polygon_layer(self.layer, xs, ys, self.counts[rows], props)
+
+
+def _tile_frame(snap: _Snapshot, layer: str, target: pd.Timestamp, res: int) -> _TileFrame:
+    key = (layer, snap.fingerprint, target, res)
+    with _tile_frames_lock:
+        frame = _tile_frames.get(key)
+        if frame is not None:
+            _tile_frames.move_to_end(key)
+            return frame
+    frame = _TileFrame(layer, snap.for_date(target), res)
+    with _tile_frames_lock:
+        _tile_frames[key] = frame
+        while len(_tile_frames) > TILE_FRAME_CACHE_SIZE:
+            _tile_frames.popitem(last=False)
+    return frame
+
+
+@app.get(f"{API_PREFIX}/tiles/{{layer}}/{{z}}/{{x}}/{{y}}.mvt")
+def get_tile(
+    request: Request,
+    layer: str,
+    z: int,
+    x: int,
+    y: int,
+    date: str = Query(..., description="YYYY-MM-DD"),
+):
+    """
+    Mapbox Vector Tile with the risk or cost hexes intersecting tile z/x/y.
+    H3 resolution follows the zoom (TILE_H3_RES_BY_ZOOM); below TILE_DETAIL_MIN_ZOOM only the
+    layer's main value is encoded. Tiles are cached per (data version, date) and served
+    gzip / brotli like the layers; a tile without hexes (or no predictions yet) is 204.
+    """
+    if layer not in _TILE_LAYERS:
+        raise HTTPException(status_code=404, detail=f"Unknown tile layer {layer!r}; expected one of {_TILE_LAYERS}")
+    if not (0 <= z <= 24 and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Tile coordinates out of range")
+    snap = _predictions.get()
+    if snap is None:
+        return Response(status_code=204)
+    target = pd.to_datetime(date).normalize()
+    res = _h3_res_for_zoom(z)
+    key = (f"tile_{layer}", snap.fingerprint, target, z, x, y)
+    return _cached_response(
+        request,
+        key,
+        lambda: _tile_frame(snap, layer, target, res).encode(z, x, y, detail=z >= TILE_DETAIL_MIN_ZOOM),
+        MVT_MEDIA_TYPE,
+        cache=_tile_cache,
+        empty_status=204,
+    )
+
+
+def _history_rows(df: pd.DataFrame) -> list[dict]:
+    dates = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+    return [
+        {
+            "date": d,
+            "p_event_7d": float(p),
+            "risk_band": band,
+            "expected_cost_usd": float(e),
+        }
+        for d, p, band, e in zip(
+            dates, _column(df, "p_event_7d"), df["risk_band"], _column(df, "expected_cost_usd"),
+        )
+    ]
+
+
+def _histories(h3_ids: list[str], days: int) -> dict[str, pd.DataFrame]:
+    """Cell-clustered history store when the pipeline wrote one, else the predictions' h3_id index."""
+    store = _history.get()
+    if store is not None:
+        return store.lookup_many(h3_ids, days)
+    snap = _predictions.get()
+    if snap is None:
+        return {h: pd.DataFrame(columns=["date", "p_event_7d", "risk_band"]) for h in h3_ids}
+    return {h: snap.for_cell(h).tail(days) for h in h3_ids}
 
 
 @app.get(f"{API_PREFIX}/cell/{{h3_id}}/history")
@@ -185,22 +1282,56 @@ def get_cell_history(
     days: int = Query(180, ge=1, le=365),
 ):
     """Time series of risk/cost for one cell (last N days)."""
-    df = _load_predictions()
-    if df.empty:
-        return {"h3_id": h3_id, "history": []}
-    df = df[df["h3_id"] == h3_id].copy()
-    df["date"] = pd.to_datetime(df["date"]).dt.normalize()
-    df = df.sort_values("date").tail(days)
-    history = [
-        {
-            "date": row["date"].strftime("%Y-%m-%d"),
-            "p_event_7d": float(row["p_event_7d"]),
-            "risk_band": row["risk_band"],
-            "expected_cost_usd": float(row.get("expected_cost_usd", 0)),
-        }
-        for _, row in df.iterrows()
-    ]
-    return {"h3_id": h3_id, "history": history}
+    df = _histories([h3_id], days)[h3_id]
+    return {"h3_id": h3_id, "history": _history_rows(df)}
+
+
+@app.get(f"{API_PREFIX}/cells/history")
+def get_cells_history(
+    h3_ids: str = Query(..., description="Comma-separated h3 ids"),
+    days: int = Query(180, ge=1, le=365),
+):
+    """Time series for many cells in one call (side panel); same row format as /cell/{h3_id}/history."""
+    ids = list(dict.fromkeys(h for h in h3_ids.split(",") if h))
+    if len(ids) > HISTORY_BATCH_MAX_CELLS:
+        raise HTTPException(status_code=400, detail=f"At most {HISTORY_BATCH_MAX_CELLS} cells per call")
+    frames = _histories(ids, days)
+    return {"cells": [{"h3_id": h, "history": _history_rows(frames[h])} for h in ids]}
+
+
+def _collect_dataset_metrics() -> None:
+    """Scrape-time gauges: loaded data versions and the last pipeline run's stage metrics."""
+    release = _releases.directory().name
+    _DATASET_INFO.clear()
+    _DATASET_ROWS.clear()
+    for f in _releases.files:
+        snap = f.get() if f.loaded else None
+        if snap is None:
+            continue
+        version = hashlib.blake2b(repr(snap.fingerprint).encode(), digest_size=6).hexdigest()
+        _DATASET_INFO.set(1, file=f.name, release=release, version=version)
+        if isinstance(snap, _Snapshot):
+            _DATASET_ROWS.set(len(snap.df), file=f.name)
+    run = load_pipeline_metrics()
+    for gauge in (_PIPELINE_STAGE_SECONDS, _PIPELINE_STAGE_ROWS, _PIPELINE_STAGE_RSS, _PIPELINE_LAST_RUN):
+        gauge.clear()
+    if run is None:
+        return
+    _PIPELINE_LAST_RUN.set(1, status=run.get("status"), release=run.get("release") or "", finished_at=run.get("finished_at") or "")
+    for stage in run.get("stages", []):
+        _PIPELINE_STAGE_SECONDS.set(stage["seconds"], stage=stage["name"])
+        _PIPELINE_STAGE_RSS.set(stage["max_rss_bytes"], stage=stage["name"])
+        for direction in ("in", "out"):
+            rows = stage.get(f"rows_{direction}")
+            if rows is not None:
+                _PIPELINE_STAGE_ROWS.set(rows, stage=stage["name"], direction=direction)
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text format: request latency / size histograms, cache lookups, dataset versions, pipeline stages."""
+    _collect_dataset_metrics()
+    return Response(content=_metrics.render(), media_type=PROMETHEUS_MEDIA_TYPE)
 
 
 @app.get("/health")
@@ -0,0 +1,147 @@
+"""
+Mapbox Vector Tile (MVT v2) encoding for hex layers.
+Minimal protobuf writer for polygon layers: no protobuf / mapbox-vector-tile dependency.
+Tile math is Web Mercator (XYZ / slippy-map tile numbering).
+"""
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+MVT_EXTENT = 4096
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+MVT_POLYGON = 3
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """(west, south, east, north) in degrees for an XYZ tile."""
+    n = 2.0 ** z
+
+    def lat(yy: float) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * yy / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def project(lon: np.ndarray, lat: np.ndarray, z: int, x: int, y: int, extent: int = MVT_EXTENT) -> tuple[np.ndarray, np.ndarray]:
+    """lon/lat (degrees) → integer tile coordinates (origin top-left, y down)."""
+    n = 2.0 ** z
+    lat_r = np.radians(np.clip(lat, -85.0511, 85.0511))
+    tx = (np.asarray(lon) + 180.0) / 360.0 * n - x
+    ty = (1.0 - np.log(np.tan(lat_r) + 1.0 / np.cos(lat_r)) / math.pi) / 2.0 * n - y
+    return np.rint(tx * extent).astype(np.int64), np.rint(ty * extent).astype(np.int64)
+
+
+# --- protobuf wire format ---
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def _zigzag(n: int) -> int:
+    return (n << 1) ^ (n >> 63)
+
+
+def _field(num: int, wire: int) -> bytes:
+    return _varint((num << 3) | wire)
+
+
+def _length_delimited(num: int, payload: bytes) -> bytes:
+    return _field(num, 2) + _varint(len(payload)) + payload
+
+
+def _packed(num: int, values: list[int]) -> bytes:
+    return _length_delimited(num, b"".join(_varint(v) for v in values))
+
+
+def _value(v) -> bytes:
+    """Layer.Value: string_value=1, float_value=2, sint_value=6, bool_value=7."""
+    if isinstance(v, str):
+        return _length_delimited(1, v.encode())
+    if isinstance(v, (bool, np.bool_)):
+        return _field(7, 0) + _varint(int(v))
+    if isinstance(v, (int, np.integer)):
+        return _field(6, 0) + _varint(_zigzag(int(v)))
+    return _field(2, 5) + np.float32(v).tobytes()
+
+
+def _ring_commands(xs: np.ndarray, ys: np.ndarray, cursor: list[int]) -> list[int] | None:
+    """MoveTo / LineTo / ClosePath commands for one closed ring; None if it collapses."""
+    pts = np.column_stack([xs, ys])[:-1]  # drop the closing vertex (ClosePath implies it)
+    keep = np.ones(len(pts), dtype=bool)
+    keep[1:] = np.any(pts[1:] != pts[:-1], axis=1)
+    pts = pts[keep]
+    if len(pts) < 3:
+        return None
+    # Exterior rings are clockwise in screen coordinates (positive surveyor's area, y down)
+    area = np.sum(pts[:, 0] * np.roll(pts[:, 1], -1) - np.roll(pts[:, 0], -1) * pts[:, 1])
+    if area == 0:
+        return None
+    if area < 0:
+        pts = pts[::-1]
+    cmds = [(1 & 0x7) | (1 << 3)]
+    cx, cy = cursor
+    for i, (px, py) in enumerate(pts.tolist()):
+        if i == 1:
+            cmds.append((2 & 0x7) | ((len(pts) - 1) << 3))
+        cmds += [_zigzag(px - cx), _zigzag(py - cy)]
+        cx, cy = px, py
+    cmds.append((7 & 0x7) | (1 << 3))
+    cursor[:] = [cx, cy]
+    return cmds
+
+
+def encode_polygon_layer(
+    name: str,
+    rings_x: np.ndarray,
+    rings_y: np.ndarray,
+    counts: np.ndarray,
+    properties: dict[str, list],
+    extent: int = MVT_EXTENT,
+) -> bytes:
+    """
+    One MVT layer of single-ring polygons. rings_x/rings_y: (n, width) tile coordinates of
+    closed rings (see h3_utils.boundary_array), counts: ring length per feature,
+    properties: column name → per-feature values.
+    """
+    keys = list(properties)
+    values: list[bytes] = []
+    value_index: dict[tuple, int] = {}
+    features = []
+    for i in range(len(counts)):
+        k = int(counts[i])
+        geometry = _ring_commands(rings_x[i, :k], rings_y[i, :k], [0, 0])
+        if geometry is None:
+            continue
+        tags = []
+        for key_idx, key in enumerate(keys):
+            v = properties[key][i]
+            if v is None:
+                continue
+            vkey = (type(v).__name__, v)
+            if vkey not in value_index:
+                value_index[vkey] = len(values)
+                values.append(_value(v))
+            tags += [key_idx, value_index[vkey]]
+        feature = _packed(2, tags) + _field(3, 0) + _varint(MVT_POLYGON) + _packed(4, geometry)
+        features.append(_length_delimited(2, feature))
+    if not features:
+        return b""
+    layer = (
+        _field(15, 0) + _varint(2)
+        + _length_delimited(1, name.encode())
+        + b"".join(features)
+        + b"".join(_length_delimited(3, k.encode()) for k in keys)
+        + b"".join(_length_delimited(4, v) for v in values)
+        + _field(5, 0) + _varint(extent)
+    )
+    return _length_delimited(3, layer)
@@ -18,6 +18,15 @@ FEATURES_DIR = DATA_DIR / "features"
 MODELS_DIR = DATA_DIR / "models"
 RAW_311_DIR = RAW_DIR / "311"
 RAW_WEATHER_DIR = RAW_DIR / "weather"
+GEOMETRY_INDEX_PATH = FEATURES_DIR / "h3_geometry.npz"  # cached hex boundaries; the pipeline writes it per release, this path is the pre-release fallback
+GEOMETRY_CACHE_MAX_CELLS = 100_000  # hex rings kept in memory per process (each cache: raw and per precision)
+RELEASES_DIR = FEATURES_DIR / "releases"  # one directory per pipeline run + CURRENT pointer (API reads)
+RELEASES_KEEP = 3  # releases kept on disk (current included)
+METRICS_DIR = DATA_DIR / "metrics"
+PIPELINE_METRICS_PATH = METRICS_DIR / "pipeline_metrics.json"  # last run: per-stage time, rows, peak RSS
+PIPELINE_MAX_WORKERS = 4  # pipeline stages run concurrently once their inputs are ready (1 = sequential)
+FEATURES_ROW_GROUP_SIZE = 50_000  # cell_day_features parquet row groups (date-sorted)
+HISTORY_ROW_GROUP_SIZE = 8_192  # cell_history parquet row groups (cell-sorted); small = cheap lookups
 
 # --- H3 ---
 H3_RESOLUTION = 9  # urban neighborhoods, ~0.105 km²
@@ -51,6 +60,10 @@ LABEL_HORIZON_DAYS = 7  # H=7
 DECAY_HALFLIFE_DAYS = 7  # for exponential decay feature
 TRAIN_MONTHS = 6  # small window for hackathon/demo
 TIME_SPLIT_VAL_RATIO = 0.2  # last 20% of time for validation/calibration
+HGB_EARLY_STOP_RATIO = 0.1  # last 10% of the training rows (by time) for hgb early stopping, not the calibration slice
+RISK_MODEL_ENGINE = "logistic"  # "logistic" | "hgb" (histogram gradient boosting)
+COMPILED_PARITY_TOL = 1e-9  # max |p| diff between sklearn and the NumPy scorer bundle
+INCREMENTAL_VAL_DAYS = 14  # incremental retrain: recalibrate on the latest 14 labeled days
 
 # --- Risk bands ---
 RISK_BAND_THRESHOLDS = (0.2, 0.5)  # low < 0.2, med < 0.5, high >= 0.5
@@ -72,6 +85,9 @@ PRESSURE_ELASTICITY_N = 1.0  # r(ΔP) = 1 - ((P-ΔP)/P)^n
 MIN_PRESSURE_PSI = 20.0
 DEFAULT_PRESSURE_PSI = 60.0
 RISK_THRESHOLD_FOR_REC = 0.3  # p_cal >= tau → candidate cell
+REC_DELTA_P_STEP_PSI: float | None = None  # e.g. 0.5 → continuous ΔP grid instead of the options above
+REC_DAILY_BUDGET: int | None = None  # max actions per day (None = unlimited)
+REC_BUDGET_UNIT = "clusters"  # "clusters" (one crew per cluster) or "cells" (one valve operation per cell)
 REC_TIME_WINDOW = "01:00-05:00"  # 1am–5am default
 
 # --- Weather ---
@@ -81,6 +97,29 @@ CHICAGO_LON = -87.6298
 OPEN_METEO_BASE = "https://api.open-meteo.com/v1"
 HEAVY_RAIN_MM = 25.0  # precip_mm per day
 
+# --- Synthetic data (benchmarks, no network) ---
+SYNTHETIC_EVENTS_PER_CELL_YEAR = 2.0  # mean leak-related requests per cell per year
+SYNTHETIC_CELLS_PER_HOTSPOT = 500  # one event hotspot per this many cells
+SYNTHETIC_HOTSPOT_KM = 1.0  # hotspot radius (Gaussian sigma)
+SYNTHETIC_REPEAT_MEAN = 1.5  # follow-up requests per first report at the same cell
+SYNTHETIC_REPEAT_DAYS = 4.0  # mean delay of a follow-up (exponential)
+
 # --- API ---
 API_PREFIX = "/api"
 GEOJSON_CRS = "EPSG:4326"
+GEOJSON_COORD_PRECISION: int | None = 6  # decimals for hex coordinates (6 ≈ 0.1 m); None = full precision
+# Vector tiles: (min zoom, H3 resolution) steps, capped at H3_RESOLUTION
+TILE_H3_RES_BY_ZOOM = ((0, 6), (9, 7), (11, 8), (13, 9))
+TILE_DETAIL_MIN_ZOOM = 13  # from this zoom tiles carry all attributes + h3_id
+TILE_CACHE_MAX_BYTES = 64 * 2**20  # encoded tiles kept in memory, per API process
+TILE_FRAME_CACHE_SIZE = 16  # (layer, date, resolution) cell sets ready for tiling
+HISTORY_BATCH_MAX_CELLS = 200  # cells per /cells/history call
+LAYER_CACHE_MAX_BYTES = 256 * 2**20  # serialized (layer, date) bodies + their gzip / brotli variants, per API process
+RESPONSE_COMPRESS_MIN_BYTES = 1024  # per-request (filtered) bodies smaller than this are sent uncompressed
+STREAM_CHUNK_ROWS = 2_000  # rows serialized per chunk in streamed layers / exports
+EXPORT_MAX_DAYS = 366  # days per /export call
+# Risk cube (time-slider): p_event_7d quantized to uint8 levels 0..RISK_CUBE_LEVELS
+RISK_CUBE_LEVELS = 254
+RISK_CUBE_MISSING = 255  # no prediction for (cell, day)
+RISK_RANGE_MAX_DAYS = 92  # days per /layers/risk/range call
+TOP_K_MAX = 1000  # k per /top call
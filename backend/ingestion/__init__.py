@@ -1,5 +1,6 @@
 from . import h3_utils
 from . import chicago_311
 from . import weather
+from . import synthetic
 
-__all__ = ["h3_utils", "chicago_311", "weather"]
+__all__ = ["h3_utils", "chicago_311", "weather", "synthetic"]
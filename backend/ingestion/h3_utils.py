@@ -1,13 +1,28 @@
 """
 H3 spatial index: point → hex id, hex → boundary (GeoJSON).
+Boundaries are cached in memory per cell and can be persisted as a compact array index
+(h3_geometry.npz, in the pipeline's release directory) so the API and pipeline do not call
+h3.cell_to_boundary per request.
 """
 from __future__ import annotations
 
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
 import geojson
 import h3
-from typing import List, Tuple
+import numpy as np
+import shapely
+
+from config import GEOMETRY_CACHE_MAX_CELLS, GEOMETRY_INDEX_PATH, H3_RESOLUTION
 
-from config import H3_RESOLUTION
+logger = logging.getLogger(__name__)
+
+GEOMETRY_INDEX_FILENAME = GEOMETRY_INDEX_PATH.name
 
 
 def lat_lon_to_h3(lat: float, lon: float, res: int | None = None) -> str:
@@ -22,12 +37,152 @@ def h3_to_boundary(h3_id: str) -> List[Tuple[float, float]]:
     return list(boundary) + [boundary[0]]
 
 
-def h3_to_geojson_polygon(h3_id: str) -> dict:
-    """GeoJSON Polygon for one hex (single ring)."""
-    coords = h3_to_boundary(h3_id)
-    # GeoJSON is [lon, lat]
-    ring = [[lon, lat] for lat, lon in coords]
-    return {"type": "Polygon", "coordinates": [ring]}
+# --- Geometry cache ---
+# h3_id -> closed GeoJSON ring ((lon, lat), ...); quantized rings are cached per precision.
+# Rings are tuples so callers cannot change the cached copy; each cache keeps the most recently
+# used GEOMETRY_CACHE_MAX_CELLS cells.
+Ring = Tuple[Tuple[float, float], ...]
+_RINGS: OrderedDict[str, Ring] = OrderedDict()
+_QUANTIZED: dict[int, OrderedDict[str, Ring]] = {}
+_cache_lock = threading.Lock()
+_index_path: Path | None = None  # index file the cache was last warmed from (set only once read)
+_index_attempted = False  # lazy load from _ring is tried once; later cells fall back to h3
+_index_lock = threading.Lock()
+
+
+def _cached(cache: OrderedDict[str, Ring], h3_id: str) -> Ring | None:
+    with _cache_lock:
+        ring = cache.get(h3_id)
+        if ring is not None:
+            cache.move_to_end(h3_id)
+    return ring
+
+
+def _remember(cache: OrderedDict[str, Ring], h3_id: str, ring: Ring) -> None:
+    with _cache_lock:
+        cache[h3_id] = ring
+        cache.move_to_end(h3_id)
+        while len(cache) > GEOMETRY_CACHE_MAX_CELLS:
+            cache.popitem(last=False)
+
+
+def _ring(h3_id: str, precision: int | None = None) -> Ring:
+    if not _index_attempted:
+        load_geometry_index()
+    ring = _cached(_RINGS, h3_id)
+    if ring is None:
+        # GeoJSON is [lon, lat]
+        ring = tuple((lon, lat) for lat, lon in h3_to_boundary(h3_id))
+        _remember(_RINGS, h3_id, ring)
+    if precision is None:
+        return ring
+    with _cache_lock:
+        cache = _QUANTIZED.setdefault(precision, OrderedDict())
+    q = _cached(cache, h3_id)
+    if q is None:
+        q = tuple(map(tuple, np.round(np.asarray(ring), precision).tolist()))
+        _remember(cache, h3_id, q)
+    return q
+
+
+def h3_to_geojson_polygon(h3_id: str, precision: int | None = None) -> dict:
+    """
+    GeoJSON Polygon for one hex (single ring). precision: round coordinates to N decimals.
+    The ring is the cached, immutable tuple of (lon, lat) pairs (serializes as nested arrays).
+    """
+    return {"type": "Polygon", "coordinates": [_ring(h3_id, precision)]}
+
+
+def boundary_array(h3_ids: Iterable[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Closed rings for many cells as one float64 array (n, max_vertices + 1, 2) of [lon, lat],
+    padded by repeating the closing vertex, plus the ring length per cell.
+    """
+    rings = [_ring(h) for h in h3_ids]
+    counts = np.fromiter((len(r) for r in rings), dtype=np.uint8, count=len(rings))
+    width = int(counts.max()) if len(rings) else 7
+    coords = np.empty((len(rings), width, 2), dtype=np.float64)
+    for i, r in enumerate(rings):
+        coords[i, : len(r)] = r
+        coords[i, len(r):] = r[-1]
+    return coords, counts
+
+
+def geometry_index_path() -> Path:
+    """The index of the published release (storage.releases), or GEOMETRY_INDEX_PATH before the first publish."""
+    from storage.releases import current_release  # storage imports ingestion at package import
+
+    release = current_release()
+    return release / GEOMETRY_INDEX_FILENAME if release is not None else GEOMETRY_INDEX_PATH
+
+
+def save_geometry_index(h3_ids: Iterable[str], out_dir: Path | None = None) -> Path:
+    """
+    Persist boundaries for the active cell set: uint64 cell ids + float array + ring lengths,
+    as out_dir/h3_geometry.npz (the pipeline's release directory), written to a temp file and renamed.
+    """
+    path = out_dir / GEOMETRY_INDEX_FILENAME if out_dir is not None else GEOMETRY_INDEX_PATH
+    cells = sorted(set(h3_ids))
+    coords, counts = boundary_array(cells)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    ids = np.array([h3.str_to_int(c) for c in cells], dtype=np.uint64)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, h3_int=ids, coords=coords, counts=counts)
+    os.replace(tmp, path)
+    return path
+
+
+def load_geometry_index(path: Path | None = None) -> int:
+    """
+    Warm the in-memory cache from a saved index (default geometry_index_path()). Returns cells loaded.
+    Each index file is read once (the API calls this again with the new release's index when it
+    switches release); a missing or unreadable file is logged and left to per-cell h3 boundaries,
+    and a later call may try again.
+    """
+    global _index_path, _index_attempted
+    path = path or geometry_index_path()
+    with _index_lock:
+        _index_attempted = True
+        if path == _index_path:
+            return 0
+        if not path.exists():
+            return 0
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                ids, coords, counts = z["h3_int"], z["coords"], z["counts"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Could not read geometry index %s, using per-cell boundaries: %s", path, e)
+            return 0
+        for cell_int, ring, k in zip(ids.tolist(), coords.tolist(), counts.tolist()):
+            _remember(_RINGS, h3.int_to_str(cell_int), tuple(map(tuple, ring[:k])))
+        _index_path = path
+        return len(ids)
+
+
+class CellSpatialIndex:
+    """
+    R-tree (shapely STRtree) over the hex polygons of a fixed cell set, for viewport queries.
+    Queries return a boolean mask over h3_ids (the order passed in).
+    """
+
+    def __init__(self, h3_ids: Iterable[str]) -> None:
+        self.h3_ids = list(h3_ids)
+        coords, _ = boundary_array(self.h3_ids)
+        self._tree = shapely.STRtree(shapely.polygons(coords))
+
+    def _mask(self, geom) -> np.ndarray:
+        mask = np.zeros(len(self.h3_ids), dtype=bool)
+        mask[self._tree.query(geom, predicate="intersects")] = True
+        return mask
+
+    def query_bbox(self, west: float, south: float, east: float, north: float) -> np.ndarray:
+        """Cells intersecting a lon/lat bounding box."""
+        return self._mask(shapely.box(west, south, east, north))
+
+    def query_geometry(self, geometry: shapely.Geometry) -> np.ndarray:
+        """Cells intersecting a shapely geometry (e.g. a viewport polygon already parsed and validated)."""
+        return self._mask(geometry)
 
 
 def h3_k_ring(h3_id: str, k: int = 1) -> List[str]:
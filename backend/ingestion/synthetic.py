@@ -0,0 +1,181 @@
+"""
+Deterministic synthetic 311 + weather data (no network), for benchmarks and local development.
+Same columns as the ingested tables (schema.RAW_311_COLS, WEATHER_DAILY_COLS):
+- weather: seasonal temperature with autocorrelated noise, wet/dry days with gamma-distributed rain;
+- 311: cells in a hex disk around the city center, event rates clustered around hotspot cells,
+  daily volume scaled by season and by that day's weather (freeze, temperature drop, rain),
+  plus repeat requests at the same cell in the following days (an unrepaired leak is reported again).
+The same arguments and seed always give the same tables.
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+from pathlib import Path
+
+import h3
+import numpy as np
+import pandas as pd
+
+from config import (
+    CHICAGO_LAT,
+    CHICAGO_LON,
+    H3_RESOLUTION,
+    LEAK_RELATED_SR_TYPES,
+    RAW_311_DIR,
+    RAW_WEATHER_DIR,
+    SYNTHETIC_CELLS_PER_HOTSPOT,
+    SYNTHETIC_EVENTS_PER_CELL_YEAR,
+    SYNTHETIC_HOTSPOT_KM,
+    SYNTHETIC_REPEAT_DAYS,
+    SYNTHETIC_REPEAT_MEAN,
+)
+from ingestion.weather import _daily_df_from_api
+
+# Share of requests per sr_type (sorted names, so the mapping does not depend on set order)
+_SR_TYPES = sorted(LEAK_RELATED_SR_TYPES)
+_SR_TYPE_WEIGHTS = np.array([
+    {"Water On Street Complaint": 8.0, "Water in Basement Complaint": 6.0, "Open Fire Hydrant Complaint": 4.0}.get(t, 1.0)
+    for t in _SR_TYPES
+])
+_SR_TYPE_WEIGHTS /= _SR_TYPE_WEIGHTS.sum()
+_KM_PER_DEG_LAT = 111.32
+FORECAST_DAYS = 16  # weather rows past `end`, like ingest_weather's forecast window
+
+
+def synthetic_cells(n_cells: int, resolution: int | None = None) -> list[str]:
+    """The n_cells hexes nearest the city center (a filled disk), nearest first."""
+    resolution = resolution or H3_RESOLUTION
+    center = h3.latlng_to_cell(CHICAGO_LAT, CHICAGO_LON, resolution)
+    # A k-ring disk holds 3k(k+1) + 1 cells
+    k = int(np.ceil((-3 + np.sqrt(9 + 12 * max(n_cells - 1, 0))) / 6))
+    return [c for ring in range(k + 1) for c in sorted(h3.grid_ring(center, ring))][:n_cells]
+
+
+def synthetic_weather(start: date, end: date, seed: int = 0) -> pd.DataFrame:
+    """Daily weather for [start, end]; derived columns (freeze, temp_drop_c, heavy_rain) as in ingestion."""
+    rng = np.random.default_rng([seed, 1])
+    dates = pd.date_range(start, end, freq="D")
+    doy = dates.dayofyear.to_numpy()
+    noise = np.empty(len(dates))
+    level = 0.0
+    for i, e in enumerate(rng.normal(0.0, 2.0, len(dates))):
+        level = 0.7 * level + e
+        noise[i] = level
+    # Coldest around Jan 20, ~-4 °C; warmest in July, ~24 °C
+    tavg = 10.0 - 14.0 * np.cos(2 * np.pi * (doy - 20) / 365.25) + noise
+    tmin = tavg - 4.0 - np.abs(rng.normal(0.0, 1.5, len(dates)))
+    tmax = tavg + 4.0 + np.abs(rng.normal(0.0, 1.5, len(dates)))
+    wet = rng.random(len(dates)) < 0.3 + 0.08 * np.sin(2 * np.pi * (doy - 100) / 365.25)
+    precip = np.where(wet, rng.gamma(0.7, 9.0, len(dates)), 0.0)
+    return _daily_df_from_api({
+        "time": dates,
+        "temperature_2m_min": np.round(tmin, 1).tolist(),
+        "temperature_2m_max": np.round(tmax, 1).tolist(),
+        "temperature_2m_mean": np.round(tavg, 1).tolist(),
+        "precipitation_sum": np.round(precip, 1).tolist(),
+    })
+
+
+def _cell_rates(cells: list[str], rng: np.random.Generator, events_per_cell_year: float) -> tuple[np.ndarray, np.ndarray]:
+    """(lat, lon) per cell and its event rate per year, concentrated around hotspot cells."""
+    latlon = np.array([h3.cell_to_latlng(c) for c in cells])
+    lat, lon = latlon[:, 0], latlon[:, 1]
+    y_km = lat * _KM_PER_DEG_LAT
+    x_km = lon * _KM_PER_DEG_LAT * np.cos(np.radians(CHICAGO_LAT))
+    n_hot = max(1, len(cells) // SYNTHETIC_CELLS_PER_HOTSPOT)
+    hot = rng.choice(len(cells), size=n_hot, replace=False)
+    weight = rng.lognormal(0.0, 1.0, n_hot)
+    intensity = np.full(len(cells), 0.05)
+    for h, w in zip(hot, weight):
+        d2 = (x_km - x_km[h]) ** 2 + (y_km - y_km[h]) ** 2
+        intensity += w * np.exp(-d2 / (2 * SYNTHETIC_HOTSPOT_KM ** 2))
+    rate = intensity * rng.lognormal(0.0, 0.5, len(cells))
+    return latlon, rate * (events_per_cell_year * len(cells) / rate.sum())
+
+
+def synthetic_311(
+    cells: list[str],
+    weather: pd.DataFrame,
+    start: date,
+    end: date,
+    events_per_cell_year: float = SYNTHETIC_EVENTS_PER_CELL_YEAR,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Leak-related 311 requests created in [start, end] on the given cells (raw_311 columns)."""
+    rng = np.random.default_rng([seed, 2])
+    latlon, rate = _cell_rates(cells, rng, events_per_cell_year)
+    w = weather.set_index(pd.to_datetime(weather["date"]).dt.normalize())
+    days = pd.date_range(start, end, freq="D")
+    w = w.reindex(days)
+    # More main breaks in winter, on freezing days and after sharp drops; basement water after rain
+    season = 1.0 + 0.4 * np.cos(2 * np.pi * (days.dayofyear.to_numpy() - 20) / 365.25)
+    drop = np.clip(-w["temp_drop_c"].fillna(0).to_numpy(float), 0, None)
+    factor = (
+        season
+        * (1.0 + 1.5 * w["freeze"].fillna(0).to_numpy(float))
+        * (1.0 + 0.08 * drop)
+        * (1.0 + 0.02 * w["precip_mm"].fillna(0).to_numpy(float))
+        * (1.0 + 0.8 * w["heavy_rain"].fillna(0).to_numpy(float))
+    )
+    factor /= factor.mean()
+    # rate counts repeats too: each first report is followed by Poisson(SYNTHETIC_REPEAT_MEAN) more
+    per_day = rng.poisson(rate.sum() / (1.0 + SYNTHETIC_REPEAT_MEAN) / 365.25 * factor)
+    first_day = np.repeat(np.arange(len(days)), per_day)
+    first_cell = rng.choice(len(cells), size=len(first_day), p=rate / rate.sum())
+    repeats = rng.poisson(SYNTHETIC_REPEAT_MEAN, len(first_day))
+    repeat_day = np.repeat(first_day, repeats) + rng.exponential(SYNTHETIC_REPEAT_DAYS, repeats.sum()).astype(int)
+    inside = repeat_day < len(days)
+    day = np.concatenate([first_day, repeat_day[inside]])
+    cell = np.concatenate([first_cell, np.repeat(first_cell, repeats)[inside]])
+    n = len(day)
+    created = days.to_numpy()[day] + (rng.random(n) * 86_400).astype("timedelta64[s]")
+    hours = rng.lognormal(np.log(36.0), 1.0, n)
+    cells_arr = np.asarray(cells, dtype=object)
+    sr_type = np.asarray(_SR_TYPES, dtype=object)[rng.choice(len(_SR_TYPES), size=n, p=_SR_TYPE_WEIGHTS)]
+    short = {t: "".join(word[0] for word in t.split()).upper() for t in _SR_TYPES}
+    df = pd.DataFrame({
+        "created_ts": pd.to_datetime(created),
+        "closed_ts": pd.to_datetime(created + (hours * 3600).astype("timedelta64[s]")),
+        "sr_type": sr_type,
+        "sr_short_code": pd.Series(sr_type).map(short).to_numpy(),
+        "status": "Completed",
+        # Jitter well inside the hex (res 9 edge ≈ 170 m)
+        "lat": latlon[cell, 0] + rng.uniform(-3e-4, 3e-4, n),
+        "lon": latlon[cell, 1] + rng.uniform(-3e-4, 3e-4, n),
+        "h3_id": cells_arr[cell],
+    })
+    df = df.sort_values("created_ts", ignore_index=True)
+    df.insert(0, "sr_number", [f"SR{i:09d}" for i in range(n)])
+    return df
+
+
+def generate(
+    years: float,
+    n_cells: int,
+    end: date | None = None,
+    events_per_cell_year: float = SYNTHETIC_EVENTS_PER_CELL_YEAR,
+    seed: int = 0,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """(raw_311, weather_daily) for `years` of history ending at `end` (default today) on n_cells cells."""
+    end = end or date.today()
+    start = end - timedelta(days=int(round(years * 365.25)))
+    weather = synthetic_weather(start, end + timedelta(days=FORECAST_DAYS), seed)
+    df311 = synthetic_311(synthetic_cells(n_cells), weather, start, end, events_per_cell_year, seed)
+    return df311, weather
+
+
+def write_raw(
+    df311: pd.DataFrame,
+    weather: pd.DataFrame,
+    raw_311_dir: Path | None = None,
+    raw_weather_dir: Path | None = None,
+) -> None:
+    """Write in the ingestion layout (311_YYYY_MM.parquet per month, weather_daily.parquet)."""
+    raw_311_dir = raw_311_dir or RAW_311_DIR
+    raw_weather_dir = raw_weather_dir or RAW_WEATHER_DIR
+    raw_311_dir.mkdir(parents=True, exist_ok=True)
+    raw_weather_dir.mkdir(parents=True, exist_ok=True)
+    month = df311["created_ts"].dt.to_period("M")
+    for period, part in df311.groupby(month, sort=True):
+        part.to_parquet(raw_311_dir / f"311_{period.year}_{period.month:02d}.parquet", index=False)
+    weather.to_parquet(raw_weather_dir / "weather_daily.parquet", index=False)
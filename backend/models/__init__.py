@@ -1,5 +1,11 @@
-from . import risk_model
-from . import pricing_model
-from . import recommendation_model
+# Submodules are imported on first access (PEP 562), so e.g. models.compiled_scorer loads
+# without risk_model pulling in scikit-learn.
+import importlib
 
-__all__ = ["risk_model", "pricing_model", "recommendation_model"]
+__all__ = ["risk_model", "pricing_model", "recommendation_model", "compiled_scorer"]
+
+
+def __getattr__(name: str):
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
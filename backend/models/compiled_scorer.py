@@ -0,0 +1,139 @@
+"""
+Dependency-free scorer for the calibrated logistic risk model.
+Reproduces predict_proba from a small .npz bundle (scaler mean/scale, coefficients,
+intercept, isotonic breakpoints) with NumPy only: no scikit-learn, no joblib.
+The pipeline's predict stage scores with it when the bundle exists (risk_model.predict).
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from config import MODELS_DIR, RISK_BAND_THRESHOLDS
+
+SCORER_FILENAME = "scorer.npz"
+
+
+class CompiledScorer:
+    """
+    p = interp(coef · clip((clip(x) - mean) / scale) + intercept, iso_x, iso_y).
+    Without isotonic breakpoints (uncalibrated model) p = sigmoid(decision).
+    """
+
+    def __init__(
+        self,
+        feature_cols: list[str],
+        mean: np.ndarray,
+        scale: np.ndarray,
+        coef: np.ndarray,
+        intercept: float,
+        iso_x: np.ndarray | None = None,
+        iso_y: np.ndarray | None = None,
+    ) -> None:
+        self.feature_cols = list(feature_cols)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64).ravel()
+        self.intercept = float(intercept)
+        self.iso_x = np.asarray(iso_x if iso_x is not None else [], dtype=np.float64)
+        self.iso_y = np.asarray(iso_y if iso_y is not None else [], dtype=np.float64)
+
+    def _matrix(self, X: Any) -> np.ndarray:
+        # DataFrame: same column selection / fill as risk_model._prepare_X
+        if hasattr(X, "reindex"):
+            X = X.reindex(columns=self.feature_cols).fillna(0).to_numpy(dtype=np.float64)
+        return np.clip(np.asarray(X, dtype=np.float64), -1e6, 1e6)
+
+    def transform(self, X: Any) -> np.ndarray:
+        """Scaled, clipped feature matrix (as risk_model._prepare_X)."""
+        return np.clip((self._matrix(X) - self.mean) / self.scale, -10.0, 10.0)
+
+    def decision_function(self, X: Any) -> np.ndarray:
+        return self.transform(X) @ self.coef + self.intercept
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        d = self.decision_function(X)
+        if self.iso_x.size:
+            p1 = np.clip(np.interp(d, self.iso_x, self.iso_y), 0.0, 1.0)
+        else:
+            p1 = 1.0 / (1.0 + np.exp(-d))
+        return np.column_stack([1.0 - p1, p1])
+
+    def predict_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Prediction rows for df (date, h3_id + feature columns), as risk_model.predict."""
+        X_s = self.transform(df)
+        return prediction_frame(df, self.predict_proba(df)[:, 1], X_s, self.coef, self.feature_cols)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            feature_cols=np.array(self.feature_cols),
+            mean=self.mean,
+            scale=self.scale,
+            coef=self.coef,
+            intercept=np.array(self.intercept),
+            iso_x=self.iso_x,
+            iso_y=self.iso_y,
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "CompiledScorer":
+        with np.load(path, allow_pickle=False) as z:
+            return cls(
+                feature_cols=[str(c) for c in z["feature_cols"]],
+                mean=z["mean"],
+                scale=z["scale"],
+                coef=z["coef"],
+                intercept=float(z["intercept"]),
+                iso_x=z["iso_x"],
+                iso_y=z["iso_y"],
+            )
+
+
+def _band(p: float) -> str:
+    low, high = RISK_BAND_THRESHOLDS
+    if p < low:
+        return "low"
+    if p < high:
+        return "medium"
+    return "high"
+
+
+def prediction_frame(
+    df: pd.DataFrame,
+    p: np.ndarray,
+    X_s: np.ndarray,
+    coef: np.ndarray | None,
+    feature_cols: list[str],
+) -> pd.DataFrame:
+    """
+    date, h3_id, risk_score, p_event_7d, risk_band and top_drivers (the 5 largest |coef * x_scaled|
+    for linear models, else "[]") for scored rows of df.
+    """
+    out = df[["date", "h3_id"]].copy()
+    out["risk_score"] = p
+    out["p_event_7d"] = np.clip(p, 1e-6, 1 - 1e-6)
+    out["risk_band"] = out["p_event_7d"].apply(_band)
+    if coef is not None:
+        coef = np.asarray(coef, dtype=np.float64).ravel()
+        drivers = []
+        for i in range(len(X_s)):
+            row = X_s[i]
+            contrib = [(feature_cols[j], float(coef[j] * row[j])) for j in range(len(feature_cols))]
+            top = sorted(contrib, key=lambda t: -abs(t[1]))[:5]
+            drivers.append(json.dumps([{"name": k, "contribution": v} for k, v in top]))
+        out["top_drivers"] = drivers
+    else:
+        out["top_drivers"] = "[]"
+    return out
+
+
+def load_scorer(path: Path | None = None) -> CompiledScorer:
+    """Load the bundle written next to model.joblib by risk_model.save_model."""
+    path = path or MODELS_DIR / "risk_model" / SCORER_FILENAME
+    return CompiledScorer.load(path)
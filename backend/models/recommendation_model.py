@@ -6,20 +6,27 @@ from __future__ import annotations
 
 import json
 import logging
+from functools import lru_cache
 from pathlib import Path
 
 import h3
+import numpy as np
 import pandas as pd
 
 from config import (
     DEFAULT_PRESSURE_PSI,
+    GEOJSON_COORD_PRECISION,
     MIN_PRESSURE_PSI,
     PRESSURE_ELASTICITY_N,
     PRESSURE_REDUCTION_OPTIONS_PSI,
+    REC_BUDGET_UNIT,
+    REC_DAILY_BUDGET,
+    REC_DELTA_P_STEP_PSI,
     REC_TIME_WINDOW,
     RISK_THRESHOLD_FOR_REC,
 )
 from ingestion.h3_utils import h3_to_geojson_polygon
+from storage.schema import REC_COLS
 
 logger = logging.getLogger(__name__)
 
@@ -32,83 +39,242 @@ def _savings(L: float, P: float, delta_p: float, n: float) -> float:
     return L * r
 
 
+def _savings_matrix(L: np.ndarray, P: float, delta_p: np.ndarray, n: float) -> np.ndarray:
+    """_savings for every cluster × option at once: shape (len(L), len(delta_p)); infeasible → 0."""
+    delta_p = np.asarray(delta_p, dtype=float)
+    feasible = (P > 0) & (delta_p > 0) & (P - delta_p >= MIN_PRESSURE_PSI)
+    r = np.where(feasible, 1.0 - (np.clip(P - delta_p, 0.0, None) / P) ** n, 0.0)
+    return np.asarray(L, dtype=float)[:, None] * r[None, :]
+
+
+def pressure_reduction_grid(P: float = DEFAULT_PRESSURE_PSI, step: float = 0.5) -> np.ndarray:
+    """Continuous ΔP grid: step, 2*step, ... up to the largest reduction keeping P >= MIN_PRESSURE_PSI."""
+    max_dp = P - MIN_PRESSURE_PSI
+    if max_dp < step:
+        return np.empty(0)
+    return np.arange(1, int(np.floor(max_dp / step + 1e-9)) + 1) * step
+
+
+def select_under_budget(savings: np.ndarray, cost: np.ndarray, capacity: float) -> np.ndarray:
+    """
+    0/1 knapsack, greedy: take items by savings/cost until the first one that does not fit,
+    then keep the better of that prefix and the single best item that fits on its own.
+    max(prefix, best single) >= OPT/2 (prefix + critical item >= LP relaxation >= OPT);
+    with unit costs the prefix is exactly the top-k and optimal.
+    Returns a boolean mask over items.
+    """
+    savings = np.asarray(savings, dtype=float)
+    cost = np.asarray(cost, dtype=float)
+    keep = np.zeros(len(savings), dtype=bool)
+    fits = (cost <= capacity) & (savings > 0)
+    if not fits.any():
+        return keep
+    order = np.argsort(-savings / np.maximum(cost, 1e-12), kind="stable")
+    order = order[fits[order]]
+    prefix = order[np.cumsum(cost[order]) <= capacity]
+    best_single = order[np.argmax(savings[order])]
+    if savings[prefix].sum() >= savings[best_single]:
+        keep[prefix] = True
+    else:
+        keep[best_single] = True
+    return keep
+
+
+@lru_cache(maxsize=200_000)
+def _ring1(h3_id: str) -> tuple[str, ...]:
+    """1-ring neighbours (excluding the cell itself); cached across days and runs."""
+    return tuple(n for n in h3.grid_disk(h3_id, 1) if n != h3_id)
+
+
+def _neighbor_table(cells: np.ndarray) -> list[list[int]]:
+    """For each cell (by index), indices of its 1-ring neighbours that are also in cells."""
+    index = {c: i for i, c in enumerate(cells)}
+    return [[index[n] for n in _ring1(c) if n in index] for c in cells]
+
+
+def _find(parent: list[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]  # path halving
+        i = parent[i]
+    return i
+
+
+def cluster_cells_by_date(dates: pd.Series, h3_ids: pd.Series) -> np.ndarray:
+    """
+    Connected components of adjacent cells, separately per date, in one union-find pass over
+    all (date, h3_id) rows. Returns a cluster label per row; labels are numbered in order of
+    first appearance, so each date's clusters are contiguous in row order of that date.
+    """
+    n = len(h3_ids)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    date_codes, _ = pd.factorize(dates)
+    cell_codes, cells = pd.factorize(h3_ids)
+    neighbors = _neighbor_table(np.asarray(cells))
+    row_of = {(d, c): i for i, (d, c) in enumerate(zip(date_codes.tolist(), cell_codes.tolist()))}
+    parent = list(range(n))
+    for i, (d, c) in enumerate(zip(date_codes.tolist(), cell_codes.tolist())):
+        for nb in neighbors[c]:
+            j = row_of.get((d, nb))
+            if j is None:
+                continue
+            ri, rj = _find(parent, i), _find(parent, j)
+            if ri != rj:
+                # Smaller root wins so the label follows the first row of the component
+                if ri < rj:
+                    parent[rj] = ri
+                else:
+                    parent[ri] = rj
+    roots = np.fromiter((_find(parent, i) for i in range(n)), dtype=np.int64, count=n)
+    labels, _ = pd.factorize(roots)
+    return labels
+
+
 def cluster_adjacent_h3(h3_ids: list[str]) -> list[list[str]]:
     """
     Cluster H3 cells by adjacency (k-ring connected components).
-    Simple: for each cell, get 1-ring; merge sets that share a cell.
+    Cells keep their input order within each cluster.
     """
     if not h3_ids:
         return []
-    seen = set()
-    clusters = []
-    for c in h3_ids:
-        if c in seen:
-            continue
-        # BFS from c
-        cluster = []
-        stack = [c]
-        while stack:
-            cell = stack.pop()
-            if cell in seen:
-                continue
-            seen.add(cell)
-            cluster.append(cell)
-            for n in h3.grid_disk(cell, 1):
-                if n in h3_ids and n not in seen:
-                    stack.append(n)
-        if cluster:
-            clusters.append(cluster)
-    return clusters
+    ids = pd.Series(list(dict.fromkeys(h3_ids)))
+    labels = cluster_cells_by_date(pd.Series(0, index=ids.index), ids)
+    return ids.groupby(labels, sort=True).agg(list).tolist()
+
+
+CELL_RECOMMENDATION_COLS = [
+    "date", "h3_id", "rec_id", "cluster_rec_id", "selected", "action_type", "delta_p_psi",
+    "time_window", "expected_savings_usd", "p_event_7d", "rationale",
+]
 
 
 def build_recommendations(
     pred_df: pd.DataFrame,
     tau: float = RISK_THRESHOLD_FOR_REC,
     P: float = DEFAULT_PRESSURE_PSI,
-    delta_p_options: tuple[int, ...] = PRESSURE_REDUCTION_OPTIONS_PSI,
+    delta_p_options: tuple[float, ...] | np.ndarray = PRESSURE_REDUCTION_OPTIONS_PSI,
     n: float = PRESSURE_ELASTICITY_N,
     time_window: str = REC_TIME_WINDOW,
+    delta_p_step: float | None = REC_DELTA_P_STEP_PSI,
+    daily_budget: float | None = REC_DAILY_BUDGET,
+    budget_unit: str = REC_BUDGET_UNIT,
 ) -> pd.DataFrame:
+    """Cluster recommendations only; see build_recommendation_tables."""
+    return build_recommendation_tables(
+        pred_df,
+        tau=tau,
+        P=P,
+        delta_p_options=delta_p_options,
+        n=n,
+        time_window=time_window,
+        delta_p_step=delta_p_step,
+        daily_budget=daily_budget,
+        budget_unit=budget_unit,
+    )[0]
+
+
+def build_recommendation_tables(
+    pred_df: pd.DataFrame,
+    tau: float = RISK_THRESHOLD_FOR_REC,
+    P: float = DEFAULT_PRESSURE_PSI,
+    delta_p_options: tuple[float, ...] | np.ndarray = PRESSURE_REDUCTION_OPTIONS_PSI,
+    n: float = PRESSURE_ELASTICITY_N,
+    time_window: str = REC_TIME_WINDOW,
+    delta_p_step: float | None = REC_DELTA_P_STEP_PSI,
+    daily_budget: float | None = REC_DAILY_BUDGET,
+    budget_unit: str = REC_BUDGET_UNIT,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
     pred_df must have columns: date, h3_id, p_event_7d, expected_cost_usd.
-    Returns one row per (date, cluster): rec_id, h3_ids, geometry, action, savings, rationale.
+    Returns (clusters, cells):
+    - clusters: one row per (date, cluster): rec_id, h3_ids, geometry, action, savings, rationale.
+      ΔP per cluster is the best of delta_p_options (or of pressure_reduction_grid(P, delta_p_step)),
+      scored for all clusters × options in one array op. With daily_budget set, each date keeps
+      the clusters chosen by select_under_budget, costing 1 per cluster or 1 per cell (budget_unit).
+    - cells: one row per high-risk (date, h3_id) with its cluster's ΔP and its own share of the
+      savings, expected_cost_usd * r(ΔP), so a kept cluster's cells sum to its savings.
+      cluster_rec_id / selected tell whether the cell's cluster made the final list.
     """
     out = []
-    for date, group in pred_df.groupby("date"):
-        high = group[group["p_event_7d"] >= tau]
-        if high.empty:
-            continue
-        cells = high["h3_id"].tolist()
-        clusters = cluster_adjacent_h3(cells)
-        for i, cluster in enumerate(clusters):
-            L = pred_df.loc[pred_df["h3_id"].isin(cluster) & (pred_df["date"] == date), "expected_cost_usd"].sum()
-            best_dp = 0
-            best_savings = 0.0
-            for dp in delta_p_options:
-                if P - dp >= MIN_PRESSURE_PSI:
-                    s = _savings(L, P, float(dp), n)
-                    if s > best_savings:
-                        best_savings = s
-                        best_dp = dp
-            if best_dp == 0:
-                continue
-            rec_id = f"{date}_{i}"
-            # GeoJSON: MultiPolygon from list of hex polygons
-            polys = [h3_to_geojson_polygon(h) for h in cluster]
-            geom = {"type": "MultiPolygon", "coordinates": [p["coordinates"] for p in polys]}
-            rationale = "high 311 recency + stress"
-            out.append({
-                "date": date,
-                "rec_id": rec_id,
-                "h3_ids": json.dumps(cluster),
-                "geometry_geojson": json.dumps(geom),
-                "action_type": "Pressure reduction test",
-                "delta_p_psi": best_dp,
-                "time_window": time_window,
-                "expected_savings_usd": round(best_savings, 2),
-                "rationale": rationale,
-            })
-    return pd.DataFrame(out)
+    high = pred_df.loc[pred_df["p_event_7d"] >= tau, ["date", "h3_id", "p_event_7d", "expected_cost_usd"]]
+    if high.empty:
+        return pd.DataFrame(out, columns=REC_COLS), pd.DataFrame(columns=CELL_RECOMMENDATION_COLS)
+    # Stable date sort keeps each date's rows in pred_df order (cluster numbering follows it)
+    high = high.sort_values("date", kind="stable").reset_index(drop=True)
+    high["cluster"] = cluster_cells_by_date(high["date"], high["h3_id"])
+    by_cluster = high.groupby("cluster", sort=True)
+    clusters = pd.DataFrame({
+        "date": by_cluster["date"].first(),
+        "h3_ids": by_cluster["h3_id"].agg(list),
+        "L": by_cluster["expected_cost_usd"].sum(),
+    })
+    # Cluster number within its date (rec_id suffix), before any filtering
+    clusters["i"] = clusters.groupby("date", sort=False).cumcount()
+
+    options = np.asarray(
+        pressure_reduction_grid(P, delta_p_step) if delta_p_step else delta_p_options,
+        dtype=float,
+    )
+    S = _savings_matrix(clusters["L"].to_numpy(), P, options, n)
+    if S.shape[1] == 0:
+        return pd.DataFrame(out, columns=REC_COLS), pd.DataFrame(columns=CELL_RECOMMENDATION_COLS)
+    best = S.argmax(axis=1)
+    clusters["delta_p"] = options[best]
+    clusters["savings"] = S[np.arange(len(S)), best]
+    # Savings fraction r(ΔP) per option (L = 1), for the per-cell shares
+    clusters["r"] = _savings_matrix(np.ones(1), P, options, n)[0, best]
+    cells = high.join(clusters[["delta_p", "r", "i"]], on="cluster")
+    clusters = clusters[clusters["savings"] > 0]
+
+    if daily_budget is not None and not clusters.empty:
+        if budget_unit == "cells":
+            cost = clusters["h3_ids"].str.len().to_numpy(dtype=float)
+        elif budget_unit == "clusters":
+            cost = np.ones(len(clusters))
+        else:
+            raise ValueError(f"Unknown budget_unit {budget_unit!r}; expected 'clusters' or 'cells'")
+        keep = np.zeros(len(clusters), dtype=bool)
+        savings = clusters["savings"].to_numpy()
+        for rows in clusters.groupby("date", sort=False).indices.values():
+            keep[rows] = select_under_budget(savings[rows], cost[rows], daily_budget)
+        clusters = clusters[keep]
+
+    selected = cells["cluster"].isin(clusters.index).to_numpy()
+    cell_dates = cells["date"].map(str)
+    cell_recs = pd.DataFrame({
+        "date": cells["date"],
+        "h3_id": cells["h3_id"],
+        "rec_id": cells["h3_id"] + "_" + pd.to_datetime(cells["date"]).dt.strftime("%Y-%m-%d"),
+        "cluster_rec_id": np.where(selected, cell_dates + "_" + cells["i"].map(str), None),
+        "selected": selected,
+        "action_type": "Pressure reduction test",
+        "delta_p_psi": cells["delta_p"].astype(float),
+        "time_window": time_window,
+        "expected_savings_usd": (cells["expected_cost_usd"] * cells["r"]).round(2),
+        "p_event_7d": cells["p_event_7d"].astype(float),
+        "rationale": "high 311 recency + stress",
+    }, columns=CELL_RECOMMENDATION_COLS)
+
+    for date, i, cluster, best_dp, best_savings in zip(
+        clusters["date"], clusters["i"], clusters["h3_ids"], clusters["delta_p"], clusters["savings"],
+    ):
+        rec_id = f"{date}_{i}"
+        # GeoJSON: MultiPolygon from list of hex polygons
+        polys = [h3_to_geojson_polygon(h, GEOJSON_COORD_PRECISION) for h in cluster]
+        geom = {"type": "MultiPolygon", "coordinates": [p["coordinates"] for p in polys]}
+        rationale = "high 311 recency + stress"
+        out.append({
+            "date": date,
+            "rec_id": rec_id,
+            "h3_ids": json.dumps(cluster),
+            "geometry_geojson": json.dumps(geom),
+            "action_type": "Pressure reduction test",
+            "delta_p_psi": float(best_dp),
+            "time_window": time_window,
+            "expected_savings_usd": round(float(best_savings), 2),
+            "rationale": rationale,
+        })
+    return pd.DataFrame(out, columns=REC_COLS), cell_recs.reset_index(drop=True)
 
 
 def save_recommendations(df: pd.DataFrame, path: Path) -> None:
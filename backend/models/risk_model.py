@@ -1,18 +1,20 @@
 """
 Risk model: predict p(leak-related 311 in cell in next H days).
-Logistic regression or LightGBM, time-based split, Platt scaling calibration.
+Logistic regression or histogram gradient boosting (engine="hgb"), time-based split,
+isotonic calibration on the validation slice.
 """
 from __future__ import annotations
 
-import json
 import logging
+from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import HistGradientBoostingClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import (
     accuracy_score,
@@ -24,13 +26,18 @@ from sklearn.metrics import (
 )
 
 from config import (
+    COMPILED_PARITY_TOL,
     FEATURES_DIR,
+    HGB_EARLY_STOP_RATIO,
+    INCREMENTAL_VAL_DAYS,
     LABEL_HORIZON_DAYS,
     MODELS_DIR,
-    RISK_BAND_THRESHOLDS,
+    RISK_MODEL_ENGINE,
     TIME_SPLIT_VAL_RATIO,
 )
 
+from models.compiled_scorer import SCORER_FILENAME, CompiledScorer, prediction_frame
+
 logger = logging.getLogger(__name__)
 
 FEATURE_COLS = [
@@ -39,34 +46,104 @@ FEATURE_COLS = [
     "freeze_x_cnt311_30d",
 ]
 
+ENGINES = ("logistic", "hgb")
+
+
+def _clean_labeled(df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce features and label to numeric; missing/inf features become 0."""
+    df = df.copy()
+    # Unify: fill missing/inf features with 0 so we keep all rows with a label
+    for c in FEATURE_COLS:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).replace([np.inf, -np.inf], 0)
+    if "y_event_H" not in df.columns:
+        raise ValueError("No y_event_H column in features.")
+    df["y_event_H"] = pd.to_numeric(df["y_event_H"], errors="coerce").fillna(0).astype(int)
+    return df.dropna(subset=FEATURE_COLS + ["y_event_H"])
+
 
-def _band(p: float) -> str:
-    low, high = RISK_BAND_THRESHOLDS
-    if p < low:
-        return "low"
-    if p < high:
-        return "medium"
-    return "high"
+def _calibrate(base: Any, X_val_s: np.ndarray, y_val: pd.Series) -> Any:
+    """Isotonic calibration of an already-fitted base model on the validation slice."""
+    try:
+        from sklearn.frozen import FrozenEstimator
+    except ImportError:  # scikit-learn < 1.6
+        calibrator = CalibratedClassifierCV(base, method="isotonic", cv="prefit")
+    else:
+        calibrator = CalibratedClassifierCV(FrozenEstimator(base), method="isotonic")
+    calibrator.fit(X_val_s, y_val)
+    return calibrator
+
+
+def _base_estimator(model: Any) -> Any:
+    """Unwrap CalibratedClassifierCV (and FrozenEstimator) to the fitted base model."""
+    base = model.estimator if hasattr(model, "estimator") else model
+    return base.estimator if hasattr(base, "estimator") else base
+
+
+def _fit_base(
+    engine: str,
+    X_train_s: np.ndarray,
+    y_train: pd.Series,
+    early_stop_ratio: float = HGB_EARLY_STOP_RATIO,
+) -> Any:
+    """
+    Fit the uncalibrated classifier for one engine on the (time-ordered) training rows.
+    hgb early-stops on the last early_stop_ratio of them, so the validation slice that
+    calibrates the model afterwards is not also the one that chose its iteration count.
+    """
+    if engine == "logistic":
+        base = LogisticRegression(
+            max_iter=2000,
+            random_state=42,
+            class_weight="balanced",
+            C=1.0,
+            solver="lbfgs",
+        )
+        base.fit(X_train_s, y_train)
+        return base
+    if engine == "hgb":
+        # Histogram-binned boosting (OpenMP, all cores); early stopping on the latest training
+        # rows instead of a random holdout
+        split = int(len(X_train_s) * (1 - early_stop_ratio))
+        X_fit, y_fit = X_train_s[:split], y_train.iloc[:split]
+        X_stop, y_stop = X_train_s[split:], y_train.iloc[split:]
+        early_stopping = split > 0 and y_stop.nunique() == 2 and y_fit.nunique() == 2
+        base = HistGradientBoostingClassifier(
+            max_iter=500,
+            learning_rate=0.1,
+            max_leaf_nodes=31,
+            max_bins=255,
+            l2_regularization=1.0,
+            class_weight="balanced",
+            early_stopping=early_stopping,
+            n_iter_no_change=20,
+            scoring="loss",
+            random_state=42,
+        )
+        if early_stopping:
+            base.fit(X_fit, y_fit, X_val=X_stop, y_val=y_stop)
+        else:
+            base.fit(X_train_s, y_train)
+        logger.info("hgb stopped after %s iterations", base.n_iter_)
+        return base
+    raise ValueError(f"Unknown engine {engine!r}; expected one of {ENGINES}")
 
 
 def train(
     df: pd.DataFrame,
     val_ratio: float = TIME_SPLIT_VAL_RATIO,
     use_calibration: bool = True,
+    engine: str = RISK_MODEL_ENGINE,
 ) -> tuple[Any, dict]:
     """
-    Time-based split: train on earlier period, validate/calibrate on later.
+    Time-based split: train on earlier period, validate/calibrate on later (hgb early-stops on
+    the end of the training period, see _fit_base).
+    engine: "logistic" (LogisticRegression) or "hgb" (HistGradientBoostingClassifier).
     Returns (fitted calibrator or classifier, metadata).
     """
-    df = df.sort_values("date")
-    # Unify: fill missing/inf features with 0 so we keep all rows with a label
-    for c in FEATURE_COLS:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).replace([np.inf, -np.inf], 0)
-    if "y_event_H" not in df.columns:
-        raise ValueError("No y_event_H column in features.")
-    df["y_event_H"] = pd.to_numeric(df["y_event_H"], errors="coerce").fillna(0).astype(int)
-    df = df.dropna(subset=FEATURE_COLS + ["y_event_H"])
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {ENGINES}")
+    df = _clean_labeled(df.sort_values("date"))
     n = len(df)
     if n < 10:
         raise ValueError(f"Not enough samples for training (n={n}). Need at least 10.")
@@ -88,31 +165,149 @@ def train(
     X_train_s = np.clip(X_train_s, -10.0, 10.0)
     X_val_s = np.clip(X_val_s, -10.0, 10.0)
 
-    base = LogisticRegression(
-        max_iter=2000,
-        random_state=42,
-        class_weight="balanced",
-        C=1.0,
-        solver="lbfgs",
-    )
-    base.fit(X_train_s, y_train)
+    base = _fit_base(engine, X_train_s, y_train)
     if use_calibration:
         try:
-            calibrator = CalibratedClassifierCV(base, method="isotonic", cv="prefit")
-            calibrator.fit(X_val_s, y_val)
-            model = calibrator
+            model = _calibrate(base, X_val_s, y_val)
         except Exception as e:
             logger.warning("Calibration failed (%s), using base model", e)
             model = base
     else:
         model = base
 
-    meta = {"feature_cols": FEATURE_COLS, "scaler": scaler}
+    meta = {"feature_cols": FEATURE_COLS, "scaler": scaler, "engine": engine}
     if hasattr(base, "coef_"):
         meta["coefficients"] = {c: float(v) for c, v in zip(FEATURE_COLS, base.coef_[0])}
     return model, meta
 
 
+def iter_feature_batches(
+    path: Path | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    batch_days: int = 1,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream cell_day_features in date order, batch_days at a time (start/end inclusive).
+    Only one batch is in memory; row groups outside the window are skipped via parquet stats.
+    """
+    import pyarrow.dataset as ds
+
+    path = path or FEATURES_DIR / "cell_day_features.parquet"
+    if not path.exists():
+        return
+    dataset = ds.dataset(path, format="parquet")
+    columns = ["date", "h3_id"] + FEATURE_COLS + ["y_event_H"]
+    dates = dataset.to_table(columns=["date"]).column("date").to_pandas()
+    dates = pd.to_datetime(dates).dt.normalize().drop_duplicates().sort_values()
+    if start is not None:
+        dates = dates[dates >= pd.Timestamp(start).normalize()]
+    if end is not None:
+        dates = dates[dates <= pd.Timestamp(end).normalize()]
+    dates = dates.tolist()
+    for i in range(0, len(dates), batch_days):
+        lo, hi = dates[i], dates[min(i + batch_days, len(dates)) - 1]
+        table = dataset.to_table(
+            columns=columns,
+            filter=(ds.field("date") >= lo) & (ds.field("date") <= hi),
+        )
+        if table.num_rows:
+            yield table.to_pandas()
+
+
+def train_incremental(
+    batches: Iterable[pd.DataFrame],
+    val_df: pd.DataFrame,
+    model: Any | None = None,
+    meta: dict | None = None,
+    use_calibration: bool = True,
+) -> tuple[Any, dict]:
+    """
+    Out-of-core training: SGD logistic regression + running StandardScaler updated with
+    partial_fit, one batch at a time. Warm-starts from (model, meta) when they come from a
+    previous incremental run; the isotonic calibration is refit on val_df (latest slice).
+    """
+    meta = dict(meta or {})
+    if meta.get("engine") == "sgd" and model is not None:
+        base = _base_estimator(model)
+        scaler = meta["scaler"]
+        class_counts = np.asarray(meta.get("class_counts", [0, 0]), dtype=float)
+    else:
+        base = SGDClassifier(loss="log_loss", alpha=1e-4, random_state=42)
+        scaler = StandardScaler()
+        class_counts = np.zeros(2)
+        meta = {}
+    trained_through = meta.get("trained_through")
+
+    n_seen = 0
+    for batch in batches:
+        batch = _clean_labeled(batch)
+        if batch.empty:
+            continue
+        X = batch[FEATURE_COLS].astype(float).clip(-1e6, 1e6)
+        y = batch["y_event_H"].to_numpy()
+        scaler.partial_fit(X)
+        X_s = _prepare_X(X, {"scaler": scaler})
+        # Running "balanced" class weights: partial_fit cannot use class_weight="balanced"
+        class_counts += np.bincount(y, minlength=2)[:2]
+        weights = class_counts.sum() / (2.0 * np.maximum(class_counts, 1.0))
+        base.partial_fit(X_s, y, classes=np.array([0, 1]), sample_weight=weights[y])
+        n_seen += len(batch)
+        batch_end = pd.to_datetime(batch["date"]).max().normalize()
+        if trained_through is None or batch_end > pd.Timestamp(trained_through):
+            trained_through = batch_end.strftime("%Y-%m-%d")
+    if not hasattr(base, "coef_"):
+        raise ValueError("No training batches for incremental fit.")
+    logger.info("Incremental fit on %s new rows (trained through %s)", n_seen, trained_through)
+
+    model = base
+    val_df = _clean_labeled(val_df) if not val_df.empty else val_df
+    if use_calibration and len(val_df) and val_df["y_event_H"].nunique() == 2:
+        try:
+            model = _calibrate(base, _prepare_X(val_df[FEATURE_COLS], {"scaler": scaler}), val_df["y_event_H"])
+        except Exception as e:
+            logger.warning("Calibration failed (%s), using base model", e)
+
+    meta.update({
+        "feature_cols": FEATURE_COLS,
+        "scaler": scaler,
+        "engine": "sgd",
+        "class_counts": class_counts.tolist(),
+        "trained_through": trained_through,
+        "coefficients": {c: float(v) for c, v in zip(FEATURE_COLS, base.coef_[0])},
+    })
+    return model, meta
+
+
+def update_incremental(
+    features_path: Path | None = None,
+    end_date: datetime | None = None,
+    H: int = LABEL_HORIZON_DAYS,
+    val_days: int = INCREMENTAL_VAL_DAYS,
+) -> tuple[Any, dict]:
+    """
+    Nightly update: warm-start from the saved model in MODELS_DIR (if it is an incremental
+    one), stream only the dates it has not seen yet, and recalibrate on the latest val_days.
+    Labels look H days ahead, so only dates <= end_date - H are used.
+    """
+    end_date = pd.Timestamp(end_date or datetime.utcnow()).normalize()
+    labeled_end = end_date - pd.Timedelta(days=H)
+    val_start = labeled_end - pd.Timedelta(days=val_days - 1)
+    try:
+        model, meta = load_model()
+    except Exception:
+        model, meta = None, {}
+    if meta.get("engine") != "sgd":
+        model, meta = None, {}
+    train_start = None
+    if meta.get("trained_through"):
+        train_start = pd.Timestamp(meta["trained_through"]) + pd.Timedelta(days=1)
+    batches = iter_feature_batches(features_path, start=train_start, end=val_start - pd.Timedelta(days=1))
+    val_parts = list(iter_feature_batches(features_path, start=val_start, end=labeled_end, batch_days=val_days))
+    val_df = pd.concat(val_parts, ignore_index=True) if val_parts else pd.DataFrame()
+    return train_incremental(batches, val_df, model=model, meta=meta)
+
+
 def _prepare_X(X: pd.DataFrame, meta: dict) -> np.ndarray:
     """Clip, scale if scaler in meta, then clip scaled to avoid overflow."""
     X = X.reindex(columns=FEATURE_COLS).fillna(0).astype(float).clip(-1e6, 1e6)
@@ -127,28 +322,64 @@ def predict(
     model: Any,
     df: pd.DataFrame,
     meta: dict,
+    scorer: CompiledScorer | None = None,
 ) -> pd.DataFrame:
-    """Produce risk_score and p_event_7d (calibrated when using CalibratedClassifierCV)."""
-    X = df[FEATURE_COLS].fillna(0).astype(float).clip(-1e6, 1e6)
+    """
+    Produce risk_score and p_event_7d (calibrated when using CalibratedClassifierCV).
+    With scorer (the model's compiled bundle, compiled_scorer.load_scorer) rows are scored
+    with NumPy only; model is then not used.
+    """
+    if scorer is not None:
+        return scorer.predict_frame(df)
     X_s = _prepare_X(df[FEATURE_COLS], meta)
     p_cal = model.predict_proba(X_s)[:, 1]
-    out = df[["date", "h3_id"]].copy()
-    out["risk_score"] = p_cal
-    out["p_event_7d"] = np.clip(p_cal, 1e-6, 1 - 1e-6)
-    out["risk_band"] = out["p_event_7d"].apply(_band)
-    base = model.estimator if hasattr(model, "estimator") else model
-    coef = getattr(base, "coef_", None)
-    if coef is not None and "feature_cols" in meta:
-        drivers = []
-        for i in range(len(X_s)):
-            row = X_s[i]
-            contrib = [(meta["feature_cols"][j], float(coef[0][j] * row[j])) for j in range(len(meta["feature_cols"]))]
-            top = sorted(contrib, key=lambda t: -abs(t[1]))[:5]
-            drivers.append(json.dumps([{"name": k, "contribution": v} for k, v in top]))
-        out["top_drivers"] = drivers
-    else:
-        out["top_drivers"] = "[]"
-    return out
+    coef = getattr(_base_estimator(model), "coef_", None)
+    if coef is None or "feature_cols" not in meta:
+        return prediction_frame(df, p_cal, X_s, None, FEATURE_COLS)
+    return prediction_frame(df, p_cal, X_s, coef[0], meta["feature_cols"])
+
+
+def export_compiled(model: Any, meta: dict) -> CompiledScorer:
+    """
+    Flatten scaler + linear model + isotonic calibrator into a CompiledScorer.
+    Raises ValueError for models that are not linear (no coef_) or not a single prefit calibrator.
+    """
+    base = _base_estimator(model)
+    if getattr(base, "coef_", None) is None:
+        raise ValueError(f"Cannot compile {type(base).__name__}: no linear coefficients.")
+    scaler = meta.get("scaler")
+    n_features = len(FEATURE_COLS)
+    mean = scaler.mean_ if scaler is not None else np.zeros(n_features)
+    scale = scaler.scale_ if scaler is not None else np.ones(n_features)
+    iso_x = iso_y = None
+    if hasattr(model, "calibrated_classifiers_"):
+        if len(model.calibrated_classifiers_) != 1:
+            raise ValueError("Cannot compile a cross-validated calibration ensemble.")
+        iso = model.calibrated_classifiers_[0].calibrators[0]
+        if not hasattr(iso, "X_thresholds_"):
+            raise ValueError(f"Cannot compile {type(iso).__name__} calibration.")
+        iso_x, iso_y = iso.X_thresholds_, iso.y_thresholds_
+    return CompiledScorer(
+        feature_cols=meta.get("feature_cols", FEATURE_COLS),
+        mean=mean,
+        scale=scale,
+        coef=base.coef_[0],
+        intercept=float(base.intercept_[0]),
+        iso_x=iso_x,
+        iso_y=iso_y,
+    )
+
+
+def check_parity(model: Any, meta: dict, scorer: CompiledScorer, n: int = 5000) -> float:
+    """Max |p_sklearn - p_compiled| on random inputs spanning the scaled feature range."""
+    rng = np.random.default_rng(0)
+    scaler = meta.get("scaler")
+    X = rng.normal(0.0, 3.0, size=(n, len(FEATURE_COLS)))
+    if scaler is not None:
+        X = X * scaler.scale_ + scaler.mean_
+    X = pd.DataFrame(X, columns=FEATURE_COLS)
+    expected = model.predict_proba(_prepare_X(X, meta))[:, 1]
+    return float(np.max(np.abs(expected - scorer.predict_proba(X)[:, 1])))
 
 
 def save_model(model: Any, meta: dict, path: Path | None = None) -> None:
@@ -157,6 +388,20 @@ def save_model(model: Any, meta: dict, path: Path | None = None) -> None:
     import joblib
     joblib.dump({"model": model, "meta": meta}, path / "model.joblib")
 
+    # NumPy-only bundle for cheap scoring (models.compiled_scorer); only written if it matches sklearn
+    scorer_path = path / SCORER_FILENAME
+    scorer_path.unlink(missing_ok=True)
+    try:
+        scorer = export_compiled(model, meta)
+    except ValueError as e:
+        logger.info("No compiled scorer: %s", e)
+        return
+    err = check_parity(model, meta, scorer)
+    if err > COMPILED_PARITY_TOL:
+        logger.warning("Compiled scorer parity check failed (max abs diff %.2e); not exported", err)
+        return
+    scorer.save(scorer_path)
+
 
 def load_model(path: Path | None = None) -> tuple[Any, dict]:
     import joblib
@@ -0,0 +1,4 @@
+from . import prometheus
+from . import stages
+
+__all__ = ["prometheus", "stages"]
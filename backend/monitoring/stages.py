@@ -0,0 +1,147 @@
+"""
+Per-stage pipeline metrics: wall time, row counts and peak RSS for each stage of one run,
+written as JSON (PIPELINE_METRICS_PATH) for the API's /metrics endpoint and for alerting.
+Profile mode (run_pipeline.py --profile) adds CPU time and peak traced (tracemalloc) memory
+per stage, and optionally one cProfile stats file per stage.
+"""
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+from config import PIPELINE_METRICS_PATH
+
+
+def max_rss_bytes() -> int:
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return int(rss if sys.platform == "darwin" else rss * 1024)
+
+
+@dataclass
+class Stage:
+    name: str
+    seconds: float = 0.0
+    rows_in: int | None = None
+    rows_out: int | None = None
+    max_rss_bytes: int = 0
+    cpu_seconds: float | None = None
+    peak_traced_bytes: int | None = None
+    cprofile_path: str | None = None
+
+
+@dataclass
+class StageRecorder:
+    """
+    Collects Stage records for one pipeline run; `with recorder.stage("features") as s: ... s.rows_out = n`.
+    profile=True also measures CPU time and peak tracemalloc memory per stage; with cprofile_dir
+    set, each stage runs under cProfile and its stats are dumped to <cprofile_dir>/<stage>.prof.
+    """
+
+    profile: bool = False
+    cprofile_dir: Path | None = None
+    started_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat(timespec="seconds"))
+    finished_at: str | None = None
+    status: str = "running"
+    release: str | None = None
+    stages: list[Stage] = field(default_factory=list)
+    _tracing: bool = field(default=False, repr=False)  # tracemalloc started by this recorder
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int | None = None) -> Iterator[Stage]:
+        record = Stage(name, rows_in=rows_in)
+        profiler = cProfile.Profile() if self.cprofile_dir is not None else None
+        if self.profile:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+            tracemalloc.reset_peak()
+            cpu0 = time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        t0 = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - t0
+            if profiler is not None:
+                profiler.disable()
+                self.cprofile_dir.mkdir(parents=True, exist_ok=True)
+                path = self.cprofile_dir / f"{name}.prof"
+                profiler.dump_stats(path)
+                record.cprofile_path = str(path)
+            if self.profile:
+                record.cpu_seconds = time.process_time() - cpu0
+                record.peak_traced_bytes = tracemalloc.get_traced_memory()[1]
+            record.max_rss_bytes = max_rss_bytes()
+            self.stages.append(record)
+
+    def finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def to_dict(self) -> dict:
+        out = asdict(self)
+        del out["_tracing"]
+        out["cprofile_dir"] = str(self.cprofile_dir) if self.cprofile_dir is not None else None
+        return out
+
+    def write(self, path: Path | None = None) -> Path:
+        """Atomic write (temp + rename), so a reader never sees a partial file."""
+        path = path or PIPELINE_METRICS_PATH
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps(self.to_dict(), indent=2))
+        os.replace(tmp, path)
+        return path
+
+
+def _mb(n: int | None) -> str:
+    return "-" if n is None else f"{n / 2**20:,.1f}"
+
+
+def _rows(n: int | None) -> str:
+    return "-" if n is None else f"{n:,}"
+
+
+def format_stage_table(report: dict) -> str:
+    """Console table of a report (StageRecorder.to_dict() or a saved JSON report)."""
+    header = ("stage", "wall_s", "cpu_s", "peak_traced_mb", "max_rss_mb", "rows_in", "rows_out")
+    rows = [
+        (
+            s["name"],
+            f"{s['seconds']:.3f}",
+            "-" if s.get("cpu_seconds") is None else f"{s['cpu_seconds']:.3f}",
+            _mb(s.get("peak_traced_bytes")),
+            _mb(s.get("max_rss_bytes")),
+            _rows(s.get("rows_in")),
+            _rows(s.get("rows_out")),
+        )
+        for s in report["stages"]
+    ]
+    total = sum(s["seconds"] for s in report["stages"])
+    rows.append(("total", f"{total:.3f}", "", "", "", "", ""))
+    widths = [max(len(r[i]) for r in [header, *rows]) for i in range(len(header))]
+    lines = ["  ".join(c.ljust(w) if i == 0 else c.rjust(w) for i, (c, w) in enumerate(zip(r, widths))) for r in [header, *rows]]
+    return "\n".join(lines)
+
+
+def load_pipeline_metrics(path: Path | None = None) -> dict | None:
+    path = path or PIPELINE_METRICS_PATH
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
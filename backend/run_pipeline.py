@@ -1,18 +1,27 @@
 """
 Nightly (or on-demand) pipeline:
-1. Ingest 311 (last 60 days) + weather
+1. Ingest 311 (last 60 days) + weather (concurrently)
 2. Build cell_day_features
-3. Train or load risk model, run inference
+3. Train or load risk model (or --incremental: warm-start update on new days), run inference
+   (with the NumPy-only compiled scorer bundle when save_model exported one)
 4. Add pricing (expected_cost_usd)
-5. Generate recommendations
-6. Write predictions and recommendations to parquet for API
+5. Generate recommendations (clusters + per-cell table)
+6. Write predictions and recommendations to parquet, plus memory-mappable Arrow serving files for the API,
+   into a new release directory; the CURRENT pointer is switched to it only once everything is written
+Stages form a dependency graph (_run_stages): each starts on a thread pool (PIPELINE_MAX_WORKERS) as soon
+as its inputs are ready, and results are passed in memory, e.g. the writes and recommendations run side by side.
 """
 from __future__ import annotations
 
+import argparse
 import logging
+import shutil
 import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Any, Callable
 
 # Run from backend dir so config and packages resolve
 sys.path.insert(0, str(Path(__file__).resolve().parent))
@@ -20,15 +29,26 @@ sys.path.insert(0, str(Path(__file__).resolve().parent))
 from config import (
     DATA_DIR,
     FEATURES_DIR,
+    METRICS_DIR,
     MODELS_DIR,
+    PIPELINE_MAX_WORKERS,
+    RISK_MODEL_ENGINE,
     TRAIN_MONTHS,
 )
 from ingestion.chicago_311 import ingest_range, load_raw_311
+from ingestion.h3_utils import save_geometry_index
 from ingestion.weather import ingest_weather, load_weather
-from storage.cell_day import build_cell_day_features, build_and_save
-from models.risk_model import train, predict, save_model, load_model
+from storage.cell_day import build_and_save
+from storage.history_store import write_history_store
+from storage.risk_cube import write_risk_cube
+from storage.rankings import add_daily_ranks
+from storage.releases import new_release_dir, publish_release
+from storage.serving import serving_path, write_serving_file
+from models.risk_model import train, predict, save_model, load_model, update_incremental
+from models.compiled_scorer import SCORER_FILENAME, load_scorer
 from models.pricing_model import add_costs_to_predictions
-from models.recommendation_model import build_recommendations
+from models.recommendation_model import build_recommendation_tables
+from monitoring.stages import StageRecorder, format_stage_table
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -38,7 +58,86 @@ def run(
     ingest_days: int = 190,  # ~6 months so we have full training window
     train_if_missing: bool = True,
     skip_ingest: bool = False,
+    incremental: bool = False,
+    engine: str = RISK_MODEL_ENGINE,
+    profile: bool = False,
+    cprofile: bool = False,
+    profile_out: Path | None = None,
 ) -> None:
+    """
+    Runs the stages and writes their timings / row counts to PIPELINE_METRICS_PATH (also on failure).
+    profile: also CPU time and peak traced memory per stage, saved as a JSON report (profile_out,
+    default METRICS_DIR/profile_<time>.json) and printed as a table; cprofile: plus one .prof per stage.
+    """
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    profile = profile or cprofile
+    cprofile_dir = METRICS_DIR / f"cprofile_{stamp}" if cprofile else None
+    recorder = StageRecorder(profile=profile, cprofile_dir=cprofile_dir)
+    status = "failed"
+    try:
+        status = _run_stages(recorder, ingest_days, train_if_missing, skip_ingest, incremental, engine)
+    finally:
+        recorder.finish(status)
+        recorder.write()
+        if profile:
+            report_path = recorder.write(profile_out or METRICS_DIR / f"profile_{stamp}.json")
+            print(format_stage_table(recorder.to_dict()))
+            print(f"Profile report: {report_path}")
+
+
+class _StopPipeline(Exception):
+    """Raised by a stage to end the run early with a status ("no_data", "failed")."""
+
+    def __init__(self, status: str) -> None:
+        super().__init__(status)
+        self.status = status
+
+
+@dataclass
+class _Task:
+    """One pipeline stage: fn(stage, *results of deps) -> result, recorded as `name`."""
+
+    name: str
+    fn: Callable[..., Any]
+    deps: tuple[str, ...] = ()
+
+
+def _run_graph(tasks: list[_Task], recorder: StageRecorder, max_workers: int) -> dict[str, Any]:
+    """
+    Run tasks on a thread pool as soon as all their deps have finished; results stay in memory
+    and are passed to the dependent tasks. The first exception (e.g. _StopPipeline) stops
+    scheduling; tasks already running are waited for, then it is re-raised.
+    """
+    pending = {t.name: t for t in tasks}
+    results: dict[str, Any] = {}
+
+    def run_task(task: _Task, args: list[Any]) -> Any:
+        with recorder.stage(task.name) as stage:
+            return task.fn(stage, *args)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline") as pool:
+        running: dict[Future, str] = {}
+        while pending or running:
+            for name, task in list(pending.items()):
+                if all(d in results for d in task.deps):
+                    del pending[name]
+                    running[pool.submit(run_task, task, [results[d] for d in task.deps])] = name
+            if not running:
+                raise ValueError(f"Unsatisfiable stage dependencies: {sorted(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results
+
+
+def _run_stages(
+    recorder: StageRecorder,
+    ingest_days: int,
+    train_if_missing: bool,
+    skip_ingest: bool,
+    incremental: bool,
+    engine: str,
+) -> str:
     end = datetime.utcnow()
     start_ingest = end - timedelta(days=ingest_days)
     start_train = end - timedelta(days=TRAIN_MONTHS * 31)
@@ -46,55 +145,163 @@ def run(
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     FEATURES_DIR.mkdir(parents=True, exist_ok=True)
     MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    model_path = MODELS_DIR / "risk_model" / "model.joblib"
 
-    if not skip_ingest:
-        logger.info("Ingesting 311 (leak-related) and weather...")
-        ingest_range(start_ingest, end)
-        ingest_weather(start_ingest.date(), end.date())
+    # API-facing outputs go to a new release directory, published once every write is done
+    release_dir = new_release_dir()
 
-    df311 = load_raw_311()
-    df_weather = load_weather()
-    if df311.empty:
-        logger.warning("No 311 data; run ingest first.")
-        return
+    def ingest_311(stage):
+        if not skip_ingest:
+            logger.info("Ingesting 311 (leak-related)...")
+            ingest_range(start_ingest, end)
+        df311 = load_raw_311()
+        stage.rows_out = len(df311)
+        if df311.empty:
+            logger.warning("No 311 data; run ingest first.")
+            raise _StopPipeline("no_data")
+        return df311
 
-    logger.info("Building cell_day_features...")
-    try:
-        df_features = build_and_save(start_train, end, FEATURES_DIR)
-    except Exception as e:
-        logger.exception("Feature build failed: %s", e)
-        return
-    if df_features.empty:
-        logger.warning("No features built.")
-        return
-
-    # Risk model: train or load
-    model_path = MODELS_DIR / "risk_model" / "model.joblib"
-    if train_if_missing and not model_path.exists():
-        logger.info("Training risk model...")
-        model, meta = train(df_features, use_calibration=True)
-        save_model(model, meta)
-    else:
+    def ingest_weather_daily(stage):
+        if not skip_ingest:
+            logger.info("Ingesting weather...")
+            ingest_weather(start_ingest.date(), end.date())
+        df_weather = load_weather()
+        stage.rows_out = len(df_weather)
+        return df_weather
+
+    def features(stage, df311, df_weather):
+        logger.info("Building cell_day_features...")
+        stage.rows_in = len(df311)
         try:
-            model, meta = load_model()
+            df_features = build_and_save(start_train, end, FEATURES_DIR, df311=df311, df_weather=df_weather)
         except Exception as e:
-            logger.info("Could not load model, training... %s", e)
-            model, meta = train(df_features, use_calibration=True)
+            logger.exception("Feature build failed: %s", e)
+            raise _StopPipeline("failed") from e
+        stage.rows_out = len(df_features)
+        if df_features.empty:
+            logger.warning("No features built.")
+            raise _StopPipeline("no_data")
+        return df_features
+
+    def train_model(stage, df_features):
+        # Risk model: train or load
+        stage.rows_in = len(df_features)
+        if incremental:
+            # Warm-start from the saved model; only newly labeled days are streamed from parquet
+            logger.info("Updating risk model incrementally...")
+            model, meta = update_incremental(FEATURES_DIR / "cell_day_features.parquet", end)
             save_model(model, meta)
+        elif train_if_missing and not model_path.exists():
+            logger.info("Training risk model...")
+            model, meta = train(df_features, use_calibration=True, engine=engine)
+            save_model(model, meta)
+        else:
+            try:
+                model, meta = load_model()
+            except Exception as e:
+                logger.info("Could not load model, training... %s", e)
+                model, meta = train(df_features, use_calibration=True, engine=engine)
+                save_model(model, meta)
+        return model, meta
+
+    def predict_latest(stage, df_features, model_meta):
+        # Inference on latest feature set; save_model wrote the NumPy bundle next to the model
+        # when it matches sklearn, and then that is what scores
+        model, meta = model_meta
+        stage.rows_in = len(df_features)
+        scorer = load_scorer() if (model_path.parent / SCORER_FILENAME).exists() else None
+        logger.info("Scoring with %s", "compiled scorer" if scorer is not None else type(model).__name__)
+        pred_df = predict(model, df_features, meta, scorer=scorer)
+        stage.rows_out = len(pred_df)
+        return pred_df
+
+    def cost(stage, pred_df):
+        stage.rows_in = len(pred_df)
+        pred_df = add_daily_ranks(add_costs_to_predictions(pred_df))
+        stage.rows_out = len(pred_df)
+        return pred_df
 
-    # Inference on latest feature set
-    pred_df = predict(model, df_features, meta)
-    pred_df = add_costs_to_predictions(pred_df)
-    pred_path = FEATURES_DIR / "cell_day_predictions.parquet"
-    pred_df.to_parquet(pred_path, index=False)
-    logger.info("Wrote predictions to %s", pred_path)
+    def write_predictions(stage, pred_df):
+        stage.rows_in = len(pred_df)
+        pred_path = release_dir / "cell_day_predictions.parquet"
+        pred_df.to_parquet(pred_path, index=False)
+        write_serving_file(pred_df, serving_path(pred_path))
+        logger.info("Wrote predictions to %s", pred_path)
+        geom_path = save_geometry_index(pred_df["h3_id"].unique(), release_dir)
+        logger.info("Wrote geometry index to %s", geom_path)
+
+    def write_history(stage, pred_df):
+        stage.rows_in = len(pred_df)
+        history_path = write_history_store(pred_df, release_dir)
+        logger.info("Wrote cell history store to %s", history_path)
+
+    def write_cube(stage, pred_df):
+        stage.rows_in = len(pred_df)
+        cube_path = write_risk_cube(pred_df, release_dir)
+        logger.info("Wrote risk cube to %s", cube_path)
+
+    def recommend(stage, pred_df):
+        stage.rows_in = len(pred_df)
+        rec_df, cell_rec_df = build_recommendation_tables(pred_df)
+        stage.rows_out = len(rec_df)
+        return rec_df, cell_rec_df
+
+    def write_recommendations(stage, tables):
+        rec_df, cell_rec_df = tables
+        stage.rows_in = len(rec_df) + len(cell_rec_df)
+        rec_path = release_dir / "recommendations.parquet"
+        rec_df.to_parquet(rec_path, index=False)
+        write_serving_file(rec_df, serving_path(rec_path))
+        logger.info("Wrote recommendations to %s", rec_path)
+        cell_rec_path = release_dir / "cell_recommendations.parquet"
+        cell_rec_df.to_parquet(cell_rec_path, index=False)
+        write_serving_file(cell_rec_df, serving_path(cell_rec_path))
+        logger.info("Wrote per-cell recommendations to %s", cell_rec_path)
+
+    tasks = [
+        _Task("ingest_311", ingest_311),
+        _Task("ingest_weather", ingest_weather_daily),
+        _Task("features", features, ("ingest_311", "ingest_weather")),
+        _Task("train", train_model, ("features",)),
+        _Task("predict", predict_latest, ("features", "train")),
+        _Task("cost", cost, ("predict",)),
+        _Task("write_predictions", write_predictions, ("cost",)),
+        _Task("write_history", write_history, ("cost",)),
+        _Task("write_risk_cube", write_cube, ("cost",)),
+        _Task("recommend", recommend, ("cost",)),
+        _Task("write_recommendations", write_recommendations, ("recommend",)),
+    ]
+    # Overlapping stages would share one tracemalloc peak and CPU clock: profile sequentially
+    max_workers = 1 if recorder.profile else PIPELINE_MAX_WORKERS
+    try:
+        _run_graph(tasks, recorder, max_workers)
+    except _StopPipeline as stop:
+        shutil.rmtree(release_dir, ignore_errors=True)
+        return stop.status
+    except BaseException:
+        shutil.rmtree(release_dir, ignore_errors=True)
+        raise
 
-    # Recommendations
-    rec_df = build_recommendations(pred_df)
-    rec_path = FEATURES_DIR / "recommendations.parquet"
-    rec_df.to_parquet(rec_path, index=False)
-    logger.info("Wrote recommendations to %s", rec_path)
+    publish_release(release_dir)
+    recorder.release = release_dir.name
+    logger.info("Published release %s", release_dir.name)
+    return "ok"
 
 
 if __name__ == "__main__":
-    run(skip_ingest=("--skip-ingest" in sys.argv))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skip-ingest", action="store_true")
+    parser.add_argument("--incremental", action="store_true", help="warm-start SGD update on newly labeled days")
+    parser.add_argument("--engine", choices=("logistic", "hgb"), default=RISK_MODEL_ENGINE, help="risk model engine when (re)training")
+    parser.add_argument("--profile", action="store_true", help="per-stage wall/CPU time and peak memory report (JSON + table)")
+    parser.add_argument("--cprofile", action="store_true", help="with --profile: also dump cProfile stats per stage")
+    parser.add_argument("--profile-out", type=Path, default=None, help="profile report path (default data/metrics/profile_<time>.json)")
+    args = parser.parse_args()
+    run(
+        skip_ingest=args.skip_ingest,
+        incremental=args.incremental,
+        engine=args.engine,
+        profile=args.profile,
+        cprofile=args.cprofile,
+        profile_out=args.profile_out,
+    )
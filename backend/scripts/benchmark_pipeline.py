@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark on synthetic data (ingestion/synthetic.py), no network:
+1. generate raw 311 + weather for --years of history on --cells hexes;
+2. run the pipeline (features, train, predict, cost, recommend, writes): wall time, rows/sec and
+   peak RSS per stage; with --trace-memory also CPU time and peak traced memory (profile mode,
+   which slows Python-heavy stages several times over);
+3. time the API endpoints in-process on the published release: first (cold) call, then
+   p50 / p95 over --repeats warm calls, and response size.
+The JSON report (--out) has the same "stages" layout as a profile report, so two benchmark runs
+can be diffed with scripts/compare_profiles.py.
+Run from backend: .venv/bin/python scripts/benchmark_pipeline.py --years 10 --cells 50000 --out bench.json
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+
+
+def _api_requests(pred: pd.DataFrame, rng: np.random.Generator) -> list[tuple[str, str]]:
+    """(route, url) pairs covering the main endpoints, on the latest predicted date."""
+    import h3
+
+    from config import API_PREFIX
+
+    dates = pd.to_datetime(pred["date"])
+    day = dates.max().strftime("%Y-%m-%d")
+    month_ago = (dates.max() - pd.Timedelta(days=30)).strftime("%Y-%m-%d")
+    week_ago = (dates.max() - pd.Timedelta(days=6)).strftime("%Y-%m-%d")
+    cells = pred["h3_id"].drop_duplicates().to_numpy()
+    cell = str(rng.choice(cells))
+    batch = ",".join(rng.choice(cells, size=min(50, len(cells)), replace=False))
+    lat, lon = h3.cell_to_latlng(cell)
+    z = 12
+    x = int((lon + 180.0) / 360.0 * 2 ** z)
+    y = int((1.0 - np.arcsinh(np.tan(np.radians(lat))) / np.pi) / 2.0 * 2 ** z)
+    return [
+        ("layers/risk", f"{API_PREFIX}/layers/risk?date={day}"),
+        ("layers/risk packed", f"{API_PREFIX}/layers/risk?date={day}&format=packed"),
+        ("layers/cost", f"{API_PREFIX}/layers/cost?date={day}"),
+        ("layers/recommendations", f"{API_PREFIX}/layers/recommendations?date={day}"),
+        ("layers/recommendations per_cell", f"{API_PREFIX}/layers/recommendations?date={day}&per_cell=true"),
+        ("layers/risk/range 30d", f"{API_PREFIX}/layers/risk/range?start={month_ago}&end={day}"),
+        ("top", f"{API_PREFIX}/top?date={day}&k=100"),
+        ("tiles/risk z12", f"{API_PREFIX}/tiles/risk/{z}/{x}/{y}.mvt?date={day}"),
+        ("cell/history", f"{API_PREFIX}/cell/{cell}/history?days=180"),
+        ("cells/history x50", f"{API_PREFIX}/cells/history?h3_ids={batch}&days=180"),
+        ("export/risk 7d", f"{API_PREFIX}/export/risk?start={week_ago}&end={day}&format=ndjson"),
+    ]
+
+
+def _benchmark_api(pred: pd.DataFrame, repeats: int, seed: int) -> list[dict]:
+    from fastapi.testclient import TestClient
+
+    from api.main import app
+
+    rows = []
+    with TestClient(app) as client:
+        for route, url in _api_requests(pred, np.random.default_rng(seed)):
+            t0 = time.perf_counter()
+            r = client.get(url)
+            cold = time.perf_counter() - t0
+            warm = []
+            for _ in range(repeats):
+                t0 = time.perf_counter()
+                client.get(url)
+                warm.append(time.perf_counter() - t0)
+            rows.append({
+                "route": route,
+                "status": r.status_code,
+                "bytes": len(r.content),
+                "cold_ms": cold * 1e3,
+                "p50_ms": float(np.percentile(warm, 50)) * 1e3 if warm else None,
+                "p95_ms": float(np.percentile(warm, 95)) * 1e3 if warm else None,
+            })
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=float, default=2.0)
+    parser.add_argument("--cells", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=("logistic", "hgb"), default="logistic")
+    parser.add_argument("--trace-memory", action="store_true", help="profile mode: CPU time + tracemalloc peak per stage")
+    parser.add_argument("--repeats", type=int, default=20, help="warm calls per API endpoint (0 = skip the API)")
+    parser.add_argument("--data-dir", type=Path, default=None, help="empty directory to build the dataset in (default: a temp dir)")
+    parser.add_argument("--keep", action="store_true", help="keep the data directory (e.g. for scripts/load_test_api.py)")
+    parser.add_argument("--out", type=Path, default=None, help="JSON report path")
+    args = parser.parse_args()
+
+    if args.data_dir is not None and args.data_dir.exists() and any(args.data_dir.iterdir()):
+        parser.error(f"--data-dir {args.data_dir} is not empty")
+    data_dir = args.data_dir or Path(tempfile.mkdtemp(prefix="leak_bench_"))
+    # config reads DATA_DIR at import, so pipeline / API modules are imported only after this
+    os.environ["DATA_DIR"] = str(data_dir)
+
+    import logging
+
+    import run_pipeline
+    from config import METRICS_DIR, PIPELINE_METRICS_PATH
+    from ingestion.synthetic import generate, write_raw
+    from monitoring.stages import StageRecorder
+    from storage.releases import current_release
+
+    logging.getLogger().setLevel(logging.WARNING)
+    try:
+        recorder = StageRecorder(profile=args.trace_memory)
+        with recorder.stage("generate") as stage:
+            df311, weather = generate(args.years, args.cells, seed=args.seed)
+            write_raw(df311, weather)
+            stage.rows_out = len(df311)
+        recorder.finish("ok")
+        del df311, weather
+        report_path = METRICS_DIR / "benchmark_profile.json" if args.trace_memory else PIPELINE_METRICS_PATH
+        run_pipeline.run(skip_ingest=True, engine=args.engine, profile=args.trace_memory, profile_out=report_path)
+        report = json.loads(report_path.read_text())
+        report["stages"] = [recorder.to_dict()["stages"][0], *report["stages"]]
+        for s in report["stages"]:
+            s["rows_per_s"] = s["rows_in"] / s["seconds"] if s.get("rows_in") and s["seconds"] else None
+        report["params"] = {"years": args.years, "cells": args.cells, "seed": args.seed, "engine": args.engine}
+        stages = pd.DataFrame(report["stages"]).set_index("name").rename_axis("stage")
+        table = pd.DataFrame({
+            "wall_s": stages["seconds"],
+            "rows_in": stages["rows_in"],
+            "rows_out": stages["rows_out"],
+            "rows_per_s": stages["rows_per_s"],
+            "max_rss_mb": stages["max_rss_bytes"] / 2**20,
+        })
+        if args.trace_memory:
+            table["cpu_s"] = stages["cpu_seconds"]
+            table["peak_traced_mb"] = stages["peak_traced_bytes"] / 2**20
+        for col in ("rows_in", "rows_out"):
+            table[col] = table[col].map(lambda v: "-" if pd.isna(v) else f"{int(v):,}")
+        print(table.to_string(na_rep="-", float_format=lambda v: f"{v:,.3f}"))
+
+        release = current_release()
+        if args.repeats > 0 and release is not None:
+            pred = pd.read_parquet(release / "cell_day_predictions.parquet", columns=["date", "h3_id"])
+            report["api"] = _benchmark_api(pred, args.repeats, args.seed)
+            print()
+            print(pd.DataFrame(report["api"]).to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+        if args.out:
+            args.out.write_text(json.dumps(report, indent=2))
+            print(f"Report: {args.out}")
+    finally:
+        if args.keep:
+            print(f"Data directory: {data_dir}")
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Compare risk model engines on cost and accuracy: fit time, scoring throughput (rows/sec),
+ROC-AUC and Brier on a held-out slice (last --test-ratio of rows by date).
+Each engine trains with the same time-based val split as the pipeline (train()). Linear engines
+get a second "(compiled)" row scored by the NumPy bundle, with its max |p| difference from sklearn.
+Run from backend: .venv/bin/python scripts/benchmark_risk_engines.py --engines logistic hgb
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import brier_score_loss, roc_auc_score
+
+from config import FEATURES_DIR, TIME_SPLIT_VAL_RATIO
+from models.risk_model import ENGINES, FEATURE_COLS, _clean_labeled, _prepare_X, export_compiled, train
+
+
+def _throughput(score, X, min_seconds: float = 0.5) -> float:
+    """Rows/sec for score(X), repeated until min_seconds have elapsed."""
+    n_calls = 0
+    t0 = time.perf_counter()
+    while True:
+        score(X)
+        n_calls += 1
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_seconds:
+            return n_calls * len(X) / elapsed
+
+
+def _accuracy(y: np.ndarray, proba: np.ndarray) -> dict[str, float]:
+    return {
+        "roc_auc": roc_auc_score(y, proba) if len(np.unique(y)) == 2 else float("nan"),
+        "brier": brier_score_loss(y, proba),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--test-ratio", type=float, default=TIME_SPLIT_VAL_RATIO)
+    parser.add_argument("--features", type=Path, default=FEATURES_DIR / "cell_day_features.parquet")
+    args = parser.parse_args()
+
+    if not args.features.exists():
+        print(f"Features not found: {args.features}. Run pipeline first.")
+        return 1
+    df = _clean_labeled(pd.read_parquet(args.features).sort_values("date", kind="stable"))
+    split_idx = int(len(df) * (1 - args.test_ratio))
+    fit_df, test_df = df.iloc[:split_idx], df.iloc[split_idx:]
+    y_test = test_df["y_event_H"].to_numpy()
+    print(f"fit rows: {len(fit_df):,}  test rows: {len(test_df):,}  test positive rate: {y_test.mean():.2%}")
+
+    rows = []
+    for engine in args.engines:
+        t0 = time.perf_counter()
+        model, meta = train(fit_df, engine=engine)
+        fit_s = time.perf_counter() - t0
+        X_test = test_df[FEATURE_COLS]
+
+        def score(X: pd.DataFrame) -> np.ndarray:
+            return model.predict_proba(_prepare_X(X, meta))[:, 1]
+
+        proba = score(X_test)
+        rows.append({
+            "engine": engine,
+            "fit_s": fit_s,
+            "rows_per_s": _throughput(score, X_test),
+            **_accuracy(y_test, proba),
+        })
+        # Linear engines also export to the NumPy scorer: measured on its own output
+        try:
+            scorer = export_compiled(model, meta)
+        except ValueError:
+            continue
+        compiled = scorer.predict_proba(X_test)[:, 1]
+        rows.append({
+            "engine": f"{engine} (compiled)",
+            "fit_s": fit_s,
+            "rows_per_s": _throughput(scorer.predict_proba, X_test),
+            **_accuracy(y_test, compiled),
+            "max_abs_diff": float(np.max(np.abs(compiled - proba))) if len(proba) else 0.0,
+        })
+
+    table = pd.DataFrame(rows)
+    if "max_abs_diff" in table:
+        table["max_abs_diff"] = table["max_abs_diff"].map(lambda v: "-" if pd.isna(v) else f"{v:.1e}")
+    print(table.to_string(index=False, float_format=lambda v: f"{v:,.4f}"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Compare two pipeline profile reports (run_pipeline.py --profile): per-stage wall time, CPU time,
+peak traced memory and rows out, baseline vs candidate, with the relative change.
+Run from backend: .venv/bin/python scripts/compare_profiles.py before.json after.json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+
+METRICS = {
+    "wall_s": "seconds",
+    "cpu_s": "cpu_seconds",
+    "peak_traced_mb": "peak_traced_bytes",
+    "rows_out": "rows_out",
+}
+
+
+def _stages(path: Path) -> dict[str, dict]:
+    report = json.loads(path.read_text())
+    return {s["name"]: s for s in report["stages"]}
+
+
+def _value(stage: dict | None, key: str) -> float:
+    v = None if stage is None else stage.get(METRICS[key])
+    if v is None:
+        return float("nan")
+    return v / 2**20 if key == "peak_traced_mb" else float(v)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    args = parser.parse_args()
+
+    base, cand = _stages(args.baseline), _stages(args.candidate)
+    rows = []
+    # Stage order of the baseline, then stages only the candidate ran
+    for name in [*base, *(n for n in cand if n not in base)]:
+        row = {"stage": name}
+        for key in METRICS:
+            a, b = _value(base.get(name), key), _value(cand.get(name), key)
+            row[f"{key}_a"], row[f"{key}_b"] = a, b
+            if key != "rows_out":
+                row[f"{key}_change"] = (b - a) / a if a else np.nan
+        rows.append(row)
+    total = {"stage": "total"}
+    for side, stages in (("a", base), ("b", cand)):
+        total[f"wall_s_{side}"] = sum(s["seconds"] for s in stages.values())
+    total["wall_s_change"] = (total["wall_s_b"] - total["wall_s_a"]) / total["wall_s_a"] if total["wall_s_a"] else np.nan
+    rows.append(total)
+
+    df = pd.DataFrame(rows)
+    for col in ("rows_out_a", "rows_out_b"):
+        df[col] = df[col].map(lambda v: "-" if pd.isna(v) else f"{int(v):,}")
+    for col in [c for c in df.columns if c.endswith("_change")]:
+        df[col] = df[col].map(lambda v: "" if pd.isna(v) else f"{v:+.1%}")
+    print(df.to_string(index=False, na_rep="-", float_format=lambda v: f"{v:,.3f}"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,19 +3,30 @@
 Load saved features and risk model; report accuracy and other metrics on validation set.
 Uses same time-based split as training (last 20% by time).
 Run from backend: .venv/bin/python scripts/evaluate_risk_model.py
+
+Rolling-origin backtest (retrain per fold, score the next H days, folds run in a process pool):
+  .venv/bin/python scripts/evaluate_risk_model.py backtest --folds 8 --train-days 90 --horizon 7
 """
+import argparse
+import json
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+import numpy as np
 import pandas as pd
 
-from config import FEATURES_DIR, TIME_SPLIT_VAL_RATIO
-from models.risk_model import FEATURE_COLS, _prepare_X, load_model, evaluate
+from config import DATA_DIR, FEATURES_DIR, LABEL_HORIZON_DAYS, RISK_MODEL_ENGINE, TIME_SPLIT_VAL_RATIO
+from models.risk_model import ENGINES, FEATURE_COLS, _clean_labeled, _prepare_X, load_model, evaluate, train
+
+BACKTEST_CACHE_DIR = DATA_DIR / "cache" / "backtest"
 
 
-def main():
+def evaluate_saved():
     path = FEATURES_DIR / "cell_day_features.parquet"
     if not path.exists():
         print(f"Features not found: {path}. Run pipeline first.")
@@ -57,5 +68,170 @@ def main():
     return 0
 
 
+def _feature_cache(features_path: Path, cache_dir: Path = BACKTEST_CACHE_DIR) -> Path:
+    """
+    Write cleaned X (float64), y (int8) and day (int32, days since epoch) as .npy, date-sorted,
+    so fold workers can memory-map one shared copy. Rebuilt only when the parquet changes.
+    """
+    stat = features_path.stat()
+    fingerprint = {"path": str(features_path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    meta_path = cache_dir / "meta.json"
+    if meta_path.exists() and json.loads(meta_path.read_text()) == fingerprint:
+        return cache_dir
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    df = pd.read_parquet(features_path, columns=["date"] + FEATURE_COLS + ["y_event_H"])
+    df = _clean_labeled(df)
+    df["date"] = pd.to_datetime(df["date"]).dt.normalize()
+    df = df.sort_values("date", kind="stable")
+    day = ((df["date"] - pd.Timestamp("1970-01-01")) // pd.Timedelta(days=1)).to_numpy(np.int32)
+    np.save(cache_dir / "X.npy", df[FEATURE_COLS].to_numpy(np.float64))
+    np.save(cache_dir / "y.npy", df["y_event_H"].to_numpy(np.int8))
+    np.save(cache_dir / "day.npy", day)
+    meta_path.write_text(json.dumps(fingerprint))
+    return cache_dir
+
+
+def _fold_origins(
+    days: np.ndarray, n_folds: int, train_days: int, horizon: int, step: int, gap: int,
+) -> list[tuple[int, int, int, int]]:
+    """
+    (train_start, train_end, score_start, score_end) day numbers, latest fold first.
+    The last LABEL_HORIZON_DAYS have incomplete labels and are never scored; train_end stops
+    `gap` days before score_start so training labels do not peek into the scored window.
+    """
+    last = int(days[-1]) - LABEL_HORIZON_DAYS
+    first = int(days[0])
+    folds = []
+    score_end = last
+    while len(folds) < n_folds:
+        score_start = score_end - horizon + 1
+        train_end = score_start - gap - 1
+        train_start = train_end - train_days + 1
+        if train_start < first:
+            break
+        folds.append((train_start, train_end, score_start, score_end))
+        score_end -= step
+    return folds
+
+
+def _to_date(day: int) -> str:
+    """Days since epoch -> YYYY-MM-DD."""
+    return (pd.Timestamp("1970-01-01") + pd.Timedelta(days=int(day))).strftime("%Y-%m-%d")
+
+
+def _run_fold(args: tuple) -> dict:
+    """
+    Worker: memory-map the shared cache, train on the fold window, score the next horizon.
+    A fold with no rows to score or too little training data comes back with "skipped" (the reason).
+    """
+    cache_dir, (train_start, train_end, score_start, score_end), thresholds, engine = args
+    X = np.load(cache_dir / "X.npy", mmap_mode="r")
+    y = np.load(cache_dir / "y.npy", mmap_mode="r")
+    day = np.load(cache_dir / "day.npy", mmap_mode="r")
+    tr = slice(*np.searchsorted(day, [train_start, train_end + 1]))
+    sc = slice(*np.searchsorted(day, [score_start, score_end + 1]))
+
+    def frame(rows: slice) -> pd.DataFrame:
+        df = pd.DataFrame(np.asarray(X[rows]), columns=FEATURE_COLS)
+        df["y_event_H"] = np.asarray(y[rows], dtype=int)
+        df["date"] = np.asarray(day[rows])
+        return df
+
+    train_df, score_df = frame(tr), frame(sc)
+    row = {
+        "train_start": _to_date(train_start),
+        "train_end": _to_date(train_end),
+        "score_start": _to_date(score_start),
+        "score_end": _to_date(score_end),
+        "n_train": len(train_df),
+        "n_score": len(score_df),
+        "pos_rate": float(score_df["y_event_H"].mean()) if len(score_df) else 0.0,
+    }
+    if score_df.empty:
+        row["skipped"] = "no rows to score"
+        return row
+    t0 = time.perf_counter()
+    try:
+        model, meta = train(train_df, use_calibration=True, engine=engine)
+    except ValueError as e:  # e.g. fewer than 10 training rows
+        row["skipped"] = str(e)
+        return row
+    row["train_s"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    proba = model.predict_proba(_prepare_X(score_df[FEATURE_COLS], meta))[:, 1]
+    row["score_s"] = time.perf_counter() - t0
+    for t in thresholds:
+        m = evaluate(model, score_df, meta, threshold=t)
+        row[f"precision@{t}"] = m["precision"]
+        row[f"recall@{t}"] = m["recall"]
+    row["roc_auc"], row["brier"] = m["roc_auc"], m["brier_score"]
+    from sklearn.calibration import calibration_curve
+    try:
+        frac_pos, mean_pred = calibration_curve(score_df["y_event_H"], proba, n_bins=10, strategy="quantile")
+        row["calibration"] = [[float(a), float(b)] for a, b in zip(mean_pred, frac_pos)]
+    except ValueError:
+        row["calibration"] = []
+    return row
+
+
+def backtest(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="evaluate_risk_model.py backtest")
+    parser.add_argument("--folds", type=int, default=8)
+    parser.add_argument("--train-days", type=int, default=90)
+    parser.add_argument("--horizon", type=int, default=7, help="days scored per fold")
+    parser.add_argument("--step", type=int, default=None, help="days between fold origins (default: horizon)")
+    parser.add_argument("--gap", type=int, default=LABEL_HORIZON_DAYS, help="days between train end and score start")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.3, 0.5])
+    parser.add_argument("--engine", choices=ENGINES, default=RISK_MODEL_ENGINE)
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1))
+    parser.add_argument("--out", type=Path, default=None, help="write per-fold results (incl. calibration curves) as JSON")
+    args = parser.parse_args(argv)
+
+    path = FEATURES_DIR / "cell_day_features.parquet"
+    if not path.exists():
+        print(f"Features not found: {path}. Run pipeline first.")
+        return 1
+    t0 = time.perf_counter()
+    cache_dir = _feature_cache(path)
+    days = np.load(cache_dir / "day.npy", mmap_mode="r")
+    print(f"Feature cache ready in {time.perf_counter() - t0:.2f}s ({len(days):,} rows, {cache_dir})")
+    folds = _fold_origins(days, args.folds, args.train_days, args.horizon, args.step or args.horizon, args.gap)
+    if not folds:
+        print("Not enough history for a single fold; lower --train-days or --horizon.")
+        return 1
+
+    t0 = time.perf_counter()
+    jobs = [(cache_dir, f, tuple(args.thresholds), args.engine) for f in folds]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        rows = list(pool.map(_run_fold, jobs))
+    wall = time.perf_counter() - t0
+
+    scored = [r for r in rows if "skipped" not in r]
+    skipped = [r for r in rows if "skipped" in r]
+    print(f"Rolling-origin backtest: {len(scored)} folds scored, {len(skipped)} skipped, {args.workers} workers, {wall:.2f}s wall")
+    for r in skipped:
+        print(f"  skipped {r['score_start']}..{r['score_end']} (n_train={r['n_train']:,}, n_score={r['n_score']:,}): {r['skipped']}")
+    if not scored:
+        return 1
+    table = pd.DataFrame(scored).drop(columns=["calibration"])
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print()
+    print("Calibration (mean predicted -> observed rate, quantile bins):")
+    for r in scored:
+        curve = "  ".join(f"{p:.2f}->{o:.2f}" for p, o in r["calibration"])
+        print(f"  {r['score_start']}: {curve}")
+    if args.out:
+        args.out.write_text(json.dumps(rows, indent=2))
+        print(f"Wrote {args.out}")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "backtest":
+        return backtest(argv[1:])
+    return evaluate_saved()
+
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Load test the API on localhost: starts uvicorn (api.main:app, --workers) on a dataset directory and
+replays a weighted mix of map-client requests from --concurrency concurrent clients:
+layer loads for random dates (risk / cost, GeoJSON or packed, whole city or a viewport), tiles,
+recommendation toggles (clusters <-> per cell), top-k lists and cell history lookups.
+Reports per route: requests, error rate, p50 / p95 / p99 latency and throughput; --out saves the
+results as JSON and --baseline prints the latency change against an earlier result file.
+Without --data-dir a small synthetic dataset is built first (scripts/benchmark_pipeline.py).
+Run from backend: .venv/bin/python scripts/load_test_api.py --data-dir /tmp/bench --concurrency 32 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import httpx
+import numpy as np
+import pandas as pd
+
+HOST = "127.0.0.1"
+
+# route -> share of requests
+MIX = {
+    "layers/risk": 0.20,
+    "layers/risk packed": 0.10,
+    "layers/risk bbox": 0.10,
+    "layers/cost": 0.10,
+    "tiles/risk": 0.15,
+    "layers/recommendations": 0.08,
+    "layers/recommendations per_cell": 0.07,
+    "top": 0.05,
+    "cell/history": 0.10,
+    "cells/history": 0.05,
+}
+
+
+class Workload:
+    """Random requests of the mix, drawn from the dataset's dates and cells."""
+
+    def __init__(self, pred: pd.DataFrame, seed: int) -> None:
+        from config import API_PREFIX
+
+        self.prefix = API_PREFIX
+        self.rng = np.random.default_rng(seed)
+        self.dates = pd.to_datetime(pred["date"]).drop_duplicates().sort_values().dt.strftime("%Y-%m-%d").to_numpy()
+        self.cells = pred["h3_id"].drop_duplicates().to_numpy()
+        import h3
+
+        self.latlng = np.array([h3.cell_to_latlng(c) for c in self.cells])
+        self.routes = list(MIX)
+        self.weights = np.array(list(MIX.values())) / sum(MIX.values())
+
+    def _date(self) -> str:
+        # Mostly recent days (default map view), sometimes anywhere in the range
+        if self.rng.random() < 0.7:
+            return str(self.dates[-1 - int(self.rng.integers(0, min(7, len(self.dates))))])
+        return str(self.rng.choice(self.dates))
+
+    def _cell(self) -> int:
+        return int(self.rng.integers(0, len(self.cells)))
+
+    def _bbox(self) -> str:
+        lat, lon = self.latlng[self._cell()]
+        return f"{lon - 0.02:.5f},{lat - 0.015:.5f},{lon + 0.02:.5f},{lat + 0.015:.5f}"
+
+    def _tile(self, z: int) -> tuple[int, int]:
+        lat, lon = self.latlng[self._cell()]
+        x = int((lon + 180.0) / 360.0 * 2 ** z)
+        y = int((1.0 - np.arcsinh(np.tan(np.radians(lat))) / np.pi) / 2.0 * 2 ** z)
+        return x, y
+
+    def next(self) -> tuple[str, str]:
+        route = self.routes[int(self.rng.choice(len(self.routes), p=self.weights))]
+        p, day = self.prefix, self._date()
+        if route == "layers/risk":
+            return route, f"{p}/layers/risk?date={day}"
+        if route == "layers/risk packed":
+            return route, f"{p}/layers/risk?date={day}&format=packed"
+        if route == "layers/risk bbox":
+            return route, f"{p}/layers/risk?date={day}&bbox={self._bbox()}"
+        if route == "layers/cost":
+            return route, f"{p}/layers/cost?date={day}"
+        if route == "tiles/risk":
+            z = int(self.rng.choice([10, 11, 12, 13, 14]))
+            x, y = self._tile(z)
+            return route, f"{p}/tiles/risk/{z}/{x}/{y}.mvt?date={day}"
+        if route == "layers/recommendations":
+            return route, f"{p}/layers/recommendations?date={day}"
+        if route == "layers/recommendations per_cell":
+            return route, f"{p}/layers/recommendations?date={day}&per_cell=true"
+        if route == "top":
+            return route, f"{p}/top?date={day}&k=50"
+        if route == "cell/history":
+            return route, f"{p}/cell/{self.cells[self._cell()]}/history?days=90"
+        batch = ",".join(self.rng.choice(self.cells, size=min(20, len(self.cells)), replace=False))
+        return route, f"{p}/cells/history?h3_ids={batch}&days=90"
+
+
+async def _client(client: httpx.AsyncClient, workload: Workload, deadline: float, budget: list[int], results: list) -> None:
+    while time.perf_counter() < deadline and budget[0] > 0:
+        budget[0] -= 1
+        route, url = workload.next()
+        t0 = time.perf_counter()
+        try:
+            r = await client.get(url)
+            status, size = r.status_code, r.num_bytes_downloaded
+        except httpx.HTTPError:
+            status, size = 0, 0
+        results.append((route, status, time.perf_counter() - t0, size))
+
+
+async def _run(base_url: str, workload: Workload, concurrency: int, duration: float, requests: int) -> tuple[list, float]:
+    results: list = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"Accept-Encoding": "gzip, br"}
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, headers=headers, timeout=60.0) as client:
+        t0 = time.perf_counter()
+        budget = [requests]
+        await asyncio.gather(*(
+            _client(client, workload, t0 + duration, budget, results) for _ in range(concurrency)
+        ))
+        return results, time.perf_counter() - t0
+
+
+def _summary(results: list, elapsed: float) -> pd.DataFrame:
+    df = pd.DataFrame(results, columns=["route", "status", "seconds", "bytes"])
+    rows = []
+    for route, part in [*df.groupby("route", sort=True), ("all", df)]:
+        ms = part["seconds"].to_numpy() * 1e3
+        rows.append({
+            "route": route,
+            "requests": len(part),
+            "error_rate": float(((part["status"] == 0) | (part["status"] >= 400)).mean()),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "req_per_s": len(part) / elapsed,
+            "mean_kb": float(part["bytes"].mean() / 1024),  # as transferred (compressed)
+        })
+    return pd.DataFrame(rows)
+
+
+def _wait_ready(base_url: str, server: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"API not ready after {timeout:.0f}s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", type=Path, default=None, help="dataset with a published release (default: build a small synthetic one)")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--requests", type=int, default=1_000_000, help="stop after this many requests")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of load before measuring (fills caches)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=None, help="JSON results path")
+    parser.add_argument("--baseline", type=Path, default=None, help="earlier --out file to compare latencies with")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    data_dir = args.data_dir
+    if data_dir is None:
+        tmp_dir = Path(tempfile.mkdtemp(prefix="leak_load_"))
+        data_dir = tmp_dir / "data"
+        subprocess.run(
+            [sys.executable, str(BACKEND_DIR / "scripts" / "benchmark_pipeline.py"), "--years", "1", "--cells", "3000",
+             "--repeats", "0", "--data-dir", str(data_dir), "--keep", "--seed", str(args.seed)],
+            check=True,
+        )
+    # config reads DATA_DIR at import
+    os.environ["DATA_DIR"] = str(data_dir)
+    from storage.releases import current_release
+
+    release = current_release()
+    if release is None:
+        parser.error(f"No published release under {data_dir}; run the pipeline first")
+    pred = pd.read_parquet(release / "cell_day_predictions.parquet", columns=["date", "h3_id"])
+
+    base_url = f"http://{HOST}:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", HOST, "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "DATA_DIR": str(data_dir)},
+    )
+    try:
+        _wait_ready(base_url, server)
+        workload = Workload(pred, args.seed)
+        if args.warmup > 0:
+            asyncio.run(_run(base_url, workload, args.concurrency, args.warmup, args.requests))
+        results, elapsed = asyncio.run(_run(base_url, workload, args.concurrency, args.duration, args.requests))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    summary = _summary(results, elapsed)
+    print(summary.to_string(index=False, float_format=lambda v: f"{v:,.3f}"))
+    if args.baseline:
+        base = pd.DataFrame(json.loads(args.baseline.read_text())["routes"]).set_index("route")
+        cur = summary.set_index("route")
+        change = pd.DataFrame({
+            f"{col}_change": (cur[col] - base[col]) / base[col]
+            for col in ("p50_ms", "p95_ms", "p99_ms", "req_per_s")
+        }).dropna(how="all")
+        print()
+        print(change.to_string(formatters={c: (lambda v: f"{v:+.1%}") for c in change.columns}))
+    if args.out:
+        params = {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "data_dir")}
+        args.out.write_text(json.dumps({
+            "params": {**params, "release": release.name, "elapsed_s": elapsed},
+            "routes": summary.to_dict(orient="records"),
+        }, indent=2))
+        print(f"Results: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,9 @@
 from . import schema
 from . import cell_day
+from . import history_store
+from . import risk_cube
+from . import rankings
+from . import serving
+from . import releases
 
-__all__ = ["schema", "cell_day"]
+__all__ = ["schema", "cell_day", "history_store", "risk_cube", "rankings", "serving", "releases"]
@@ -16,6 +16,7 @@ from config import (
     DATA_DIR,
     DECAY_HALFLIFE_DAYS,
     FEATURES_DIR,
+    FEATURES_ROW_GROUP_SIZE,
     LABEL_HORIZON_DAYS,
 )
 from ingestion.chicago_311 import load_raw_311
@@ -151,9 +152,14 @@ def build_and_save(
     start_date: datetime,
     end_date: datetime,
     features_dir: Path | None = None,
+    df311: pd.DataFrame | None = None,
+    df_weather: pd.DataFrame | None = None,
 ) -> pd.DataFrame:
-    df311 = load_raw_311()
-    df_weather = load_weather()
+    """Build and write cell_day_features.parquet. df311 / df_weather: tables already in memory (default: read the raw parquet)."""
+    if df311 is None:
+        df311 = load_raw_311()
+    if df_weather is None:
+        df_weather = load_weather()
     if df311.empty:
         return pd.DataFrame()
     if df_weather.empty:
@@ -164,5 +170,7 @@ def build_and_save(
     if df.empty:
         return df
     path = features_dir / "cell_day_features.parquet"
-    df.to_parquet(path, index=False)
+    # Date-sorted row groups so incremental training can stream one day at a time
+    df = df.sort_values(["date", "h3_id"], ignore_index=True)
+    df.to_parquet(path, index=False, row_group_size=FEATURES_ROW_GROUP_SIZE)
     return df
@@ -0,0 +1,93 @@
+"""
+Per-cell history store: predictions clustered by h3_id for indexed drilldown lookups.
+cell_history.parquet is sorted by (h3_id, date) in small row groups; cell_history_index.npz
+maps each cell (uint64 H3 id) to its row range, so a lookup reads only that cell's row groups.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+import h3
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from config import FEATURES_DIR, HISTORY_ROW_GROUP_SIZE
+
+HISTORY_COLS = ["h3_id", "date", "p_event_7d", "risk_band", "expected_cost_usd"]
+HISTORY_FILENAME = "cell_history.parquet"
+HISTORY_INDEX_FILENAME = "cell_history_index.npz"
+
+
+def write_history_store(pred_df: pd.DataFrame, out_dir: Path | None = None) -> Path:
+    """Write the cell-clustered parquet and its cell → (start, stop) row index."""
+    out_dir = out_dir or FEATURES_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    df = pred_df[[c for c in HISTORY_COLS if c in pred_df.columns]].copy()
+    df["date"] = pd.to_datetime(df["date"]).dt.normalize()
+    df["_h3_int"] = np.array([h3.str_to_int(h) for h in df["h3_id"]], dtype=np.uint64)
+    df = df.sort_values(["_h3_int", "date"], ignore_index=True)
+    cells, starts = np.unique(df["_h3_int"].to_numpy(), return_index=True)
+    stops = np.append(starts[1:], len(df))
+    path = out_dir / HISTORY_FILENAME
+    df.drop(columns=["_h3_int"]).to_parquet(path, index=False, row_group_size=HISTORY_ROW_GROUP_SIZE)
+    np.savez(out_dir / HISTORY_INDEX_FILENAME, h3_int=cells, start=starts.astype(np.int64), stop=stops.astype(np.int64))
+    return path
+
+
+class HistoryStore:
+    """Read side: resolves cells through the index and reads only the row groups they span."""
+
+    def __init__(self, path: Path) -> None:
+        self._file = pq.ParquetFile(path, memory_map=True)
+        with np.load(path.parent / HISTORY_INDEX_FILENAME, allow_pickle=False) as z:
+            self._cells, self._start, self._stop = z["h3_int"], z["start"], z["stop"]
+        sizes = [self._file.metadata.row_group(i).num_rows for i in range(self._file.num_row_groups)]
+        # First row of each row group
+        self._group_start = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+
+    def _range(self, h3_id: str) -> tuple[int, int] | None:
+        try:
+            key = np.uint64(h3.str_to_int(h3_id))
+        except (ValueError, TypeError, h3.H3BaseException):
+            return None
+        i = int(np.searchsorted(self._cells, key))
+        if i == len(self._cells) or self._cells[i] != key:
+            return None
+        return int(self._start[i]), int(self._stop[i])
+
+    def _read(self, ranges: list[tuple[int, int]]) -> list[pd.DataFrame]:
+        """One read of the union of row groups; then slice each (start, stop) range out of it."""
+        groups = sorted({
+            g
+            for start, stop in ranges
+            for g in range(
+                int(np.searchsorted(self._group_start, start, side="right")) - 1,
+                int(np.searchsorted(self._group_start, stop - 1, side="right")),
+            )
+        })
+        if not groups:
+            return [pd.DataFrame(columns=HISTORY_COLS) for _ in ranges]
+        table = self._file.read_row_groups(groups).to_pandas()
+        # Position of each group's first row inside the concatenated table
+        offset, local = 0, {}
+        for g in groups:
+            local[g] = offset - int(self._group_start[g])
+            offset += int(self._group_start[g + 1] - self._group_start[g])
+        out = []
+        for start, stop in ranges:
+            g = int(np.searchsorted(self._group_start, start, side="right")) - 1
+            out.append(table.iloc[start + local[g]: stop + local[g]])
+        return out
+
+    def lookup(self, h3_id: str, days: int | None = None) -> pd.DataFrame:
+        return self.lookup_many([h3_id], days)[h3_id]
+
+    def lookup_many(self, h3_ids: list[str], days: int | None = None) -> dict[str, pd.DataFrame]:
+        """History (date-sorted, last `days` rows) per requested cell; unknown cells are empty."""
+        found = {h: r for h in dict.fromkeys(h3_ids) if (r := self._range(h)) is not None}
+        if days is not None:
+            found = {h: (max(start, stop - days), stop) for h, (start, stop) in found.items()}
+        frames = dict(zip(found, self._read(list(found.values())))) if found else {}
+        empty = pd.DataFrame(columns=HISTORY_COLS)
+        return {h: frames.get(h, empty) for h in dict.fromkeys(h3_ids)}
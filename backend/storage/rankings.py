@@ -0,0 +1,33 @@
+"""
+Per-date rankings written with the predictions: rank_<metric> = 1 for the highest value of the
+metric on that date (ties broken by h3_id, missing values last), so top-K lookups need no sort.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+RANK_METRICS = ("p_event_7d", "expected_cost_usd")
+
+
+def rank_column(metric: str) -> str:
+    return f"rank_{metric}"
+
+
+def add_daily_ranks(pred_df: pd.DataFrame, metrics: tuple[str, ...] = RANK_METRICS) -> pd.DataFrame:
+    """Adds an int32 rank_<metric> column (1-based, within date) for each metric present."""
+    out = pred_df.copy()
+    dates = pd.to_datetime(out["date"]).dt.normalize()
+    for metric in metrics:
+        if metric not in out.columns:
+            continue
+        # One lexsort: date, then metric descending (NaN last), then h3_id
+        values = out[metric].to_numpy(dtype=float)
+        order = np.lexsort((out["h3_id"].to_numpy(), np.where(np.isnan(values), np.inf, -values), dates.to_numpy()))
+        sorted_dates = dates.to_numpy()[order]
+        starts = np.flatnonzero(np.r_[True, sorted_dates[1:] != sorted_dates[:-1]])
+        group_start = np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+        rank = np.empty(len(out), dtype=np.int32)
+        rank[order] = np.arange(len(order)) - group_start + 1
+        out[rank_column(metric)] = rank
+    return out
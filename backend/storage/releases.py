@@ -0,0 +1,63 @@
+"""
+Versioned pipeline outputs: each run writes its API-facing files into a fresh directory
+under RELEASES_DIR, then switches the CURRENT pointer file to it with one atomic rename.
+Readers resolve files through the pointer, so they see either the old or the new release,
+never a half-written file or a mix of two runs.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+from config import RELEASES_DIR, RELEASES_KEEP
+
+CURRENT_FILENAME = "CURRENT"
+
+
+def new_release_dir(root: Path | None = None) -> Path:
+    """Empty directory for one pipeline run, named by UTC time (sorts in publish order)."""
+    root = root or RELEASES_DIR
+    name = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    path = root / name
+    path.mkdir(parents=True, exist_ok=False)
+    return path
+
+
+def current_release(root: Path | None = None) -> Path | None:
+    """Directory the CURRENT pointer names, or None before the first publish."""
+    root = root or RELEASES_DIR
+    try:
+        name = (root / CURRENT_FILENAME).read_text().strip()
+    except FileNotFoundError:
+        return None
+    return root / name if name else None
+
+
+def publish_release(release_dir: Path, keep: int = RELEASES_KEEP) -> Path:
+    """Point CURRENT at release_dir (write temp + fsync + rename), then prune old releases."""
+    root = release_dir.parent
+    tmp = root / f".{CURRENT_FILENAME}.tmp"
+    with open(tmp, "w") as f:
+        f.write(release_dir.name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, root / CURRENT_FILENAME)
+    prune_releases(root, keep)
+    return release_dir
+
+
+def prune_releases(root: Path, keep: int = RELEASES_KEEP) -> list[Path]:
+    """
+    Delete all but the newest `keep` releases (the current one is always kept). Readers that
+    still hold an older version keep working: mapped / open files outlive the unlink.
+    """
+    current = current_release(root)
+    releases = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+    removed = []
+    for path in releases[:-keep] if keep > 0 else releases:
+        if path != current:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path)
+    return removed
@@ -0,0 +1,104 @@
+"""
+Risk cube: p_event_7d as a dense cells × days uint8 array for time-range (time-slider) queries.
+risk_cube.npz holds the cell dictionary (h3 ids, sorted), the day axis (datetime64[D]) and the
+quantized values: round(p * RISK_CUBE_LEVELS), with RISK_CUBE_MISSING where a cell has no prediction.
+"""
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from config import FEATURES_DIR, RISK_CUBE_LEVELS, RISK_CUBE_MISSING
+from ingestion.h3_utils import CellSpatialIndex
+
+RISK_CUBE_FILENAME = "risk_cube.npz"
+
+
+def quantize(p: np.ndarray) -> np.ndarray:
+    """p in [0, 1] (NaN = missing) → uint8 levels."""
+    p = np.asarray(p, dtype=float)
+    q = np.rint(np.clip(p, 0.0, 1.0) * RISK_CUBE_LEVELS)
+    return np.where(np.isnan(p), RISK_CUBE_MISSING, q).astype(np.uint8)
+
+
+def _min_level(min_p: float) -> int:
+    """Smallest level whose dequantized value (level / RISK_CUBE_LEVELS) is >= min_p."""
+    # Rounded first so that min_p = k / LEVELS maps to k despite float error in the product
+    return int(np.ceil(np.round(min(max(min_p, 0.0), 1.0) * RISK_CUBE_LEVELS, 9)))
+
+
+def build_risk_cube(pred_df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(cells, days, values) from predictions; the day axis is contiguous from first to last date."""
+    dates = pd.to_datetime(pred_df["date"]).dt.normalize().to_numpy().astype("datetime64[D]")
+    cell_codes, cells = pd.factorize(pred_df["h3_id"], sort=True)
+    if not len(dates):
+        return np.asarray(cells, dtype=str), np.empty(0, "datetime64[D]"), np.empty((0, 0), np.uint8)
+    first = dates.min()
+    days = np.arange(first, dates.max() + np.timedelta64(1, "D"))
+    values = np.full((len(cells), len(days)), RISK_CUBE_MISSING, dtype=np.uint8)
+    values[cell_codes, (dates - first).astype(np.int64)] = quantize(pred_df["p_event_7d"].to_numpy(dtype=float))
+    return np.asarray(cells, dtype=str), days, values
+
+
+def write_risk_cube(pred_df: pd.DataFrame, out_dir: Path | None = None) -> Path:
+    out_dir = out_dir or FEATURES_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    cells, days, values = build_risk_cube(pred_df)
+    path = out_dir / RISK_CUBE_FILENAME
+    np.savez(path, cells=cells, days=days, values=values)
+    return path
+
+
+class RiskCube:
+    """Read side: day-range slices of the cube, with optional viewport and min_p cell filters."""
+
+    def __init__(self, cells: np.ndarray, days: np.ndarray, values: np.ndarray) -> None:
+        self.cells, self.days, self.values = cells, days, values
+        self._spatial: CellSpatialIndex | None = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path) -> "RiskCube":
+        with np.load(path, allow_pickle=False) as z:
+            return cls(z["cells"], z["days"], z["values"])
+
+    def _cells_in(self, bbox: tuple | None, geometry: shapely.Geometry | None) -> np.ndarray:
+        with self._lock:
+            if self._spatial is None:
+                self._spatial = CellSpatialIndex(self.cells.tolist())
+        keep = np.ones(len(self.cells), dtype=bool)
+        if bbox is not None:
+            keep &= self._spatial.query_bbox(*bbox)
+        if geometry is not None:
+            keep &= self._spatial.query_geometry(geometry)
+        return keep
+
+    def query(
+        self,
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+        bbox: tuple | None = None,
+        geometry: shapely.Geometry | None = None,
+        min_p: float | None = None,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (cells, days, values) for days in [start, end]. Days outside the cube are dropped, and so
+        are cells with no prediction in the range. min_p keeps cells whose maximum p_event_7d in
+        the range reaches min_p, as served: the dequantized level / RISK_CUBE_LEVELS is compared,
+        so a cell just below min_p that rounds to min_p's level is dropped.
+        """
+        lo = int(np.searchsorted(self.days, np.datetime64(start.date(), "D")))
+        hi = int(np.searchsorted(self.days, np.datetime64(end.date(), "D"), side="right"))
+        values = self.values[:, lo:hi]
+        present = values != RISK_CUBE_MISSING
+        keep = present.any(axis=1)
+        if bbox is not None or geometry is not None:
+            keep &= self._cells_in(bbox, geometry)
+        if min_p is not None:
+            peak = np.where(present, values, 0).max(axis=1, initial=0)
+            keep &= peak >= _min_level(min_p)
+        return self.cells[keep], self.days[lo:hi], np.ascontiguousarray(values[keep])
@@ -0,0 +1,37 @@
+"""
+Serving files: pipeline outputs as uncompressed Arrow IPC (Feather v2) next to the parquet,
+rows sorted by date with normalized dates. The API memory-maps them read-only, so every
+uvicorn worker shares the same page-cache pages and loading is a header read.
+Files are replaced by rename, never rewritten in place: a mapped old version stays valid.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+SERVING_SUFFIX = ".arrow"
+
+
+def serving_path(path: Path) -> Path:
+    """Serving file for a pipeline output (cell_day_predictions.parquet → cell_day_predictions.arrow)."""
+    return path.with_suffix(SERVING_SUFFIX)
+
+
+def write_serving_file(df: pd.DataFrame, path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if "date" in df.columns:
+        df = df.assign(date=pd.to_datetime(df["date"]).dt.normalize()).sort_values("date", kind="stable")
+    tmp = path.with_name(f".{path.name}.tmp")
+    feather.write_feather(df.reset_index(drop=True), tmp, compression="uncompressed")
+    os.replace(tmp, path)
+    return path
+
+
+def read_serving_file(path: Path) -> pd.DataFrame:
+    """Zero-copy DataFrame over the mapped file (pyarrow-backed columns)."""
+    table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)